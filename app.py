@@ -24,50 +24,137 @@ __doc__ = """ReproUI is a GUI application designed to aid in the 3D printing
 service of CREA, UPM. It accesses a Google Spreadsheet and shows a list of
 pending orders"""
 
+# First, so it times the imports below
+from startup_profile import STARTUP
+# pylint: disable=wrong-import-position
+import argparse
+import itertools
 import os
 import sys
+from datetime import datetime, timezone
 
-import tomli
 import pandas as pd
+STARTUP.mark('import pandas')
 # pylint: disable=no-name-in-module
 from PyQt6.QtCore import Qt, QTimer, pyqtSlot
-from PyQt6.QtWidgets import QApplication, QMainWindow, QWidget
-from PyQt6.QtGui import QIcon
+from PyQt6.QtWidgets import (QApplication, QMainWindow, QWidget, QStatusBar,
+                             QLabel)
+from PyQt6.QtGui import QIcon, QCloseEvent, QPaintEvent
 # pylint: enable=no-name-in-module
+STARTUP.mark('import PyQt6')
 
-from google_flow import GoogleSpreadSheetInterface
+# The Google client is imported when connecting, see create_order_store
 from panel_ui import PanelUI
+from workers import BackgroundSync
+from incremental_sync import IncrementalOrderSync
+from pending_sync import PendingOrderSync
+from order_store import OrderStore
+from order_sources import (SECRETS_PATH, load_config, create_order_store,
+                           stop_credentials)
+from orders_parsing import apply_dtypes, parse_orders
+from order_cache import OrderCache
+from write_journal import WriteJournal
+from sync_scheduler import SyncScheduler
+from metrics import METRICS, log_to_file
 import constants
+STARTUP.mark('import app modules')
+# pylint: enable=wrong-import-position
 
-SECRETS_PATH = '.\\secrets'
-CONFIG_FILE = os.path.join(SECRETS_PATH, 'config.toml')
-DATA_RANGE = 'HojaA!A2:W'  # First row is col names
+CACHE_FILE = os.path.join(SECRETS_PATH, 'orders_cache.sqlite3')
+JOURNAL_FILE = os.path.join(SECRETS_PATH, 'pending_changes.sqlite3')
+# Orders read per request while the first fetch shows them as they arrive
+LOAD_CHUNK_SIZE = 2000
+# Most cells written in one request. A status changed for every order
+# selected should fit in one
+JOURNAL_BATCH_SIZE = 5000
+# Seconds from writing a status set to True to reading the orders again, so
+# those the sheet then computes as completed are no longer shown
+COMPLETION_FETCH_DELAY = 2
+
+
+def _msecs(seconds: float) -> int:
+    """Timer interval of seconds"""
+    return int(seconds*1000)
 
 
 class ReproUIApp(QMainWindow):
     """Main class app of ReproUI"""
-    def __init__(self, parent: QWidget | None) -> None:
+    def __init__(self, parent: QWidget | None, *, config: dict | None = None,
+                 order_store: OrderStore | None = None,
+                 cache_path: str = CACHE_FILE,
+                 journal_path: str = JOURNAL_FILE,
+                 profile_startup: bool = False) -> None:
+        """
+        config defaults to the contents of order_sources.CONFIG_FILE, and order_store to the
+        one configured in it. Both can be given to run the app against
+        something else, e.g. in benchmarks.
+        With profile_startup, the startup phases are printed once the first
+        fetch finishes, and the app quits
+        """
         super().__init__(parent=parent)
+        self._profile_startup = profile_startup
+        self._first_frame_shown = False
 
         # Initialize configuration
-        if(os.path.exists(CONFIG_FILE) and os.path.isfile(CONFIG_FILE)):
-            with open(CONFIG_FILE, 'rb') as cf_file:
-                self.config = tomli.load(cf_file)
-        else:
-            raise IOError('Configuration file not found')
+        STARTUP.begin('config')
+        self.config = config if config is not None else load_config()
+        if self.config.get('METRICS_LOG'):
+            log_to_file(self.config['METRICS_LOG'])
+        STARTUP.end('config')
 
-        self._init_timers()
-        self._init_ss_interface()
+        self._orders_df = None
+        # With nothing cached to show, the first fetch shows orders as they
+        # arrive, see _read_in_parts
+        self._load_in_parts = True
+        # When shown orders were fetched from the spreadsheet
+        self._orders_fetched_at = None
+        self._order_cache = OrderCache(cache_path)
+        # Checkboxes changed locally and not written yet, kept on disk so
+        # they are not lost if the network or the app fails
+        self._journal = WriteJournal(journal_path)
+        self._flush_in_flight = False
+        self._changes_in_flight = []
+        self._last_fetch_failed = False
+        self._scheduler = SyncScheduler.from_config(self.config)
 
-        self._init_ui()
+        with STARTUP.phase('window'):
+            self._init_timers()
+            self._init_ss_interface(order_store)
+            self._init_ui()
 
-        self._fetch_orders_and_update_panel()
+        # Show the last known orders right away, then refresh them once the
+        # window is shown, see _after_first_frame
+        with STARTUP.phase('cached orders'):
+            self._load_cached_orders()
+        STARTUP.begin('first paint')
+
+    def paintEvent(self, a0: QPaintEvent) -> None:  # pylint: disable=invalid-name, missing-function-docstring
+        super().paintEvent(a0)
+        if not self._first_frame_shown:
+            self._first_frame_shown = True
+            STARTUP.end('first paint')
+            # Once this paint is done
+            QTimer.singleShot(0, self._after_first_frame)
+
+    @pyqtSlot()
+    def _after_first_frame(self):
+        """
+        Starts everything not needed to show the window: connecting to the
+        spreadsheet, fetching orders and writing pending changes
+        """
+        STARTUP.begin('first fetch')
+        if self._load_in_parts:
+            STARTUP.begin('first orders shown')
+        self._retriever_slot()
+        self._data_age_timer.start()
+        # Write what could not be written last time
+        self._flush_journal()
 
     def _init_ui(self) -> None:
         self.setWindowTitle('CREA - ReproUI')
-        self.setWindowIcon(QIcon(os.path.join('.\\assets\\logos', 'logo_256.png')))
+        self.setWindowIcon(QIcon(os.path.join('.', 'assets', 'logos', 'logo_256.png')))
         # Open the qss styles file and read in the css-alike styling code
-        with open('assets\\styles\\styles.qss', 'r', encoding='utf-8') as style_fl:
+        with open(os.path.join('assets', 'styles', 'styles.qss'), 'r', encoding='utf-8') as style_fl:
             style = style_fl.read()
             self.setStyleSheet(style)
         # !Toolbars
@@ -83,81 +170,297 @@ class ReproUIApp(QMainWindow):
         self._status_bar = QStatusBar(self)
         self._status_bar.setObjectName('status_bar')
         self.setStatusBar(self._status_bar)
+        self._metrics_label = QLabel(self._status_bar)
+        self._status_bar.addPermanentWidget(self._metrics_label)
+        self._data_age_label = QLabel(self._status_bar)
+        self._status_bar.addPermanentWidget(self._data_age_label)
         # !Status bar
 
     def _init_timers(self) -> None:
+        # Intervals of these are set by the scheduler every time they start
         self._update_delay_timer = QTimer(self)
         self._update_delay_timer.setSingleShot(True)
         self._update_delay_timer.setTimerType(Qt.TimerType.CoarseTimer)
-        self._update_delay_timer.setInterval(
-            int(self.config['DB_UPDATE_DELAY']*1000)
-        )
         self._update_delay_timer.timeout.connect(self._updater_slot)
 
-        self._retrieve_interval_timer = QTimer()
-        self._retrieve_interval_timer.setSingleShot(False)
+        # Retries failed writes, or those over the rate limit
+        self._retry_timer = QTimer(self)
+        self._retry_timer.setSingleShot(True)
+        self._retry_timer.timeout.connect(self._flush_journal)
+
+        # Restarted after every fetch, see _schedule_fetch
+        self._retrieve_interval_timer = QTimer(self)
+        self._retrieve_interval_timer.setSingleShot(True)
         self._retrieve_interval_timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
-        self._retrieve_interval_timer.setInterval(
-            int(self.config['DB_RETRIEVE_INTERVAL']*1000)
-        )
         self._retrieve_interval_timer.timeout.connect(self._retriever_slot)
 
+        self._data_age_timer = QTimer(self)
+        self._data_age_timer.setTimerType(Qt.TimerType.VeryCoarseTimer)
+        self._data_age_timer.setInterval(60*1000)
+        self._data_age_timer.timeout.connect(self._update_data_age)
+
     # Google SpreadSheet functions
-    def _init_ss_interface(self) -> None:
-        self._ssheet_inter = GoogleSpreadSheetInterface(
-            secrets_path=SECRETS_PATH,
-            spreadsheet_id=self.config['SPREADSHEET_ID']
-        )
+    def _init_ss_interface(self, order_store) -> None:
+        # Created by the first fetch if not given, see _connect_ss
+        self._order_store = order_store
+        self._order_sync = None
+        # Reading, parsing and writing happen in a background thread
+        self._sync = BackgroundSync(self, self._read_ss, self._update_ss)
+        self._sync.orders_fetched.connect(self._orders_fetched_slot)
+        self._sync.orders_fetched_part.connect(self._orders_part_slot)
+        self._sync.orders_written.connect(self._orders_written_slot)
 
-    def _read_ss(self) -> pd.DataFrame:
-        try:
-            orders_raw = self._ssheet_inter.read_range(DATA_RANGE)
-            orders_df = pd.DataFrame(
-                columns=constants.COLUMN_NAMES,
-                # Make sure input is all same length as column names [23]
-                data=[order+[''] if len(order) == 22 else order
-                      for order in orders_raw]
-                )
-            orders_df = (orders_df
-                        .astype(constants.COLUMN_DTYPES)
-                        .dropna(thresh=18)
-                        )
-
-            # Yeah, we shouldn't show all the name. Privacy protection first.
-            def privacy_protect_name(name):
-                name_splitted = name.split()
-                return ' '.join([name_splitted[0]] + [nm[:1].upper()+'.'
-                                for nm in name_splitted[1:]])
-            orders_df['NAME'] = orders_df['NAME'].map(privacy_protect_name)
-            return orders_df
-
-        except TypeError as err:
-            print('Error reading orders. Check database integrity.')
-            print(err)
-            return None
-
-    def _update_ss(self, orders_df: pd.DataFrame):
-        # Here we only update what might have changed (=checkboxes)
-        # Prevents conflicts
-        self._ssheet_inter.update_range(
-            range_=constants.cols2_a1_notation('APPROVED','PAID'),
-            values=orders_df.loc[:,'APPROVED':'PAID'].values.astype(str).tolist()
-        )
+    def _connect_ss(self) -> None:
+        # Called from the background thread: setting up credentials may need
+        # the network or the user, and must not keep the window from showing
+        # If it fails, next fetch tries again
+        if self._order_store is None:
+            self._order_store = create_order_store(self.config)
+        if self._order_sync is None:
+            # Read only the orders that changed since last refresh. The
+            # daemon always sends them as differences
+            if (self.config.get('INCREMENTAL_SYNC', False)
+                    or self.config.get('DAEMON_ADDRESS')):
+                self._order_sync = IncrementalOrderSync(self._order_store)
+            # Else, read only the rows that may hold pending orders
+            else:
+                self._order_sync = PendingOrderSync(self._order_store)
+
+    @METRICS.timed('read_ss')
+    def _read_ss(self, on_part=None) -> pd.DataFrame:
+        # Called from the background thread, must not touch any widget
+        self._connect_ss()
+        if on_part is not None and self._load_in_parts:
+            orders_df = self._read_in_parts(on_part)
+        else:
+            orders_df = self._order_sync.fetch()
+        if orders_df is not None:
+            self._order_cache.save(orders_df)
+        return orders_df
+
+    def _read_in_parts(self, on_part) -> pd.DataFrame | None:
+        """
+        Reads the orders newest first, LOAD_CHUNK_SIZE at a time, and gives
+        those read so far to on_part as they arrive, so the first screen of
+        orders is shown before the whole sheet does
+        """
+        # Only once, later fetches have orders to show meanwhile
+        self._load_in_parts = False
+        if not self._order_sync.begin_seed():
+            return self._order_sync.fetch()
+        parts = []
+        n_read = n_shown = 0
+        requests = itertools.count()
+
+        def throttle():
+            # The fetch took the tokens of the first one
+            if next(requests):
+                self._scheduler.read_request()
+        for orders_df in self._order_store.read_chunks(
+                LOAD_CHUNK_SIZE, newest_first=True, throttle=throttle):
+            if orders_df is None:
+                return None
+            parts.append(orders_df)
+            n_read += len(orders_df)
+            # Shown each time they double, so showing them all along costs
+            # about as much as showing them once
+            if n_read >= 2*n_shown:
+                on_part(apply_dtypes(pd.concat(parts)))
+                n_shown = n_read
+        orders_df = (apply_dtypes(pd.concat(parts)).sort_index() if parts
+                     else parse_orders([]))
+        self._order_sync.seed(orders_df)
+        return orders_df
+
+    @METRICS.timed('update_ss')
+    def _update_ss(self, changes: list[tuple]) -> dict | None:
+        """Cells as stored after writing changes, None if not written"""
+        # Called from the background thread, must not touch any widget
+        self._connect_ss()
+        stored = self._order_store.commit_cells({
+            (row, col): value for _, row, col, value in changes})
+        # Forget them only once the store has them
+        if stored is not None:
+            self._journal.ack(changes)
+        return stored
 
     @pyqtSlot()
     def _updater_slot(self):
         """
-        Wrapper to call ._update_ss(orders) with the dataframe argument
+        Writes the changed cells, once the user stops clicking for a while
         """
+        if self._journal.count() == 0:
+            return
         self.panel_ui.orders_and_controls.setDisabled(True)
-        self._update_ss(self._orders_df)
-        # Update to get numbers, just in case
-        self._fetch_orders_and_update_panel()
+        self._flush_journal()
+
+    @pyqtSlot()
+    def _flush_journal(self):
+        """
+        Wrapper to call ._update_ss(changes) with a batch of pending changes
+        """
+        if self._flush_in_flight:
+            return
+        changes = self._journal.pending(JOURNAL_BATCH_SIZE)
+        if not changes:
+            return
+        self._retry_timer.stop()
+        if not self._scheduler.try_write():
+            # Over the rate limit, wait for it
+            self._retry_timer.start(_msecs(self._scheduler.write_wait()))
+            return
+        self._scheduler.writing()
+        self._flush_in_flight = True
+        self._changes_in_flight = changes
+        # Cells come back as stored, no fetch unless they diverge
+        self._sync.request_write(changes)
+
+    @pyqtSlot(object)
+    def _orders_written_slot(self, stored: dict | None):
+        self._flush_in_flight = False
+        changes, self._changes_in_flight = self._changes_in_flight, []
+        if stored is None:
+            # Changes stay in the journal, try again later
+            self._scheduler.failed()
+            retry_delay = self._scheduler.retry_delay()
+            self._status_bar.showMessage(
+                'No se pudieron guardar los cambios, se reintentará en '
+                f'{retry_delay:.0f} s', 10*1000)
+            self._retry_timer.start(_msecs(retry_delay))
+            self.panel_ui.apply_cells({})
+        else:
+            self._scheduler.written()
+            self._apply_stored(changes, stored)
+            # Changes made while writing, or beyond the batch size
+            self._flush_journal()
+        self._update_metrics()
+
+    def _apply_stored(self, changes: list[tuple], stored: dict) -> None:
+        """
+        Applies the cells, as stored after writing changes, to the orders
+        shown. If some were not stored as written, e.g. someone else changed
+        them too, the orders are read again. If a status was set, they are
+        read soon, as the sheet may have completed some
+        """
+        # Cells changed again meanwhile are left as the user set them
+        pending = {(row, col) for _, row, col, _ in self._journal.pending()}
+        cells = {cell: value for cell, value in stored.items()
+                 if cell not in pending}
+        if self._orders_df is not None:
+            for (row, col), value in cells.items():
+                if row in self._orders_df.index:
+                    self._orders_df.at[row, col] = value
+        self.panel_ui.apply_cells(cells)
+        if any(stored.get((row, col)) != value
+               for _, row, col, value in changes):
+            self._fetch_orders_and_update_panel()
+        elif any(value for _, _, _, value in changes):
+            # COMPLETION is computed by the sheet, it is not in the cells
+            self._schedule_fetch_soon()
 
     def _fetch_orders_and_update_panel(self):
-        # Read and update UI
-        self._orders_df = self._read_ss()
+        # Read in the background, the UI is updated when orders arrive
+        self._sync.request_fetch()
+
+    @pyqtSlot(object)
+    def _orders_fetched_slot(self, orders_df: pd.DataFrame | None):
+        STARTUP.end('first fetch')
+        if self._profile_startup:
+            print(STARTUP.report())
+            self.close()
+            return
+        if orders_df is None:
+            # Keep showing what we had
+            self._status_bar.showMessage(
+                'No se pudieron actualizar los pedidos', 10*1000)
+            self._last_fetch_failed = True
+            self._scheduler.failed()
+            self._schedule_fetch()
+            self._update_metrics()
+            return
+        self._orders_df = self._with_pending(orders_df)
+        self._orders_fetched_at = datetime.now(timezone.utc)
+        changed = self.panel_ui.set_orders(self._orders_df)
+        STARTUP.end('first orders shown')
+        self._scheduler.fetched(changed)
+        self._schedule_fetch()
+        self._update_data_age()
+        self._update_metrics()
+        # Reachable again, do not wait for the backoff to write
+        if self._last_fetch_failed:
+            self._last_fetch_failed = False
+            self._flush_journal()
+
+    @pyqtSlot(object)
+    def _orders_part_slot(self, orders_df: pd.DataFrame):
+        """Shows the orders read so far, while the fetch goes on"""
+        self._orders_df = self._with_pending(orders_df)
         self.panel_ui.set_orders(self._orders_df)
+        STARTUP.end('first orders shown')
+
+    def _with_pending(self, orders_df: pd.DataFrame) -> pd.DataFrame:
+        """Orders with the local changes waiting to be written"""
+        for _, row, col, value in self._journal.pending():
+            if row in orders_df.index:
+                orders_df.loc[row, col] = value
+        return orders_df
+
+    def _schedule_fetch(self):
+        """Starts the wait until next periodic fetch, from now"""
+        self._retrieve_interval_timer.start(
+            _msecs(self._scheduler.poll_delay()))
+
+    def _schedule_fetch_soon(self):
+        """Brings the next periodic fetch to COMPLETION_FETCH_DELAY from now"""
+        delay = _msecs(COMPLETION_FETCH_DELAY)
+        if (not self._retrieve_interval_timer.isActive()
+                or self._retrieve_interval_timer.remainingTime() > delay):
+            self._retrieve_interval_timer.start(delay)
+
+    def _load_cached_orders(self):
+        cached = self._order_cache.load()
+        if cached is not None:
+            orders_df, self._orders_fetched_at = cached
+            # With the changes not written before the app was closed
+            self._orders_df = self._with_pending(orders_df)
+            self._load_in_parts = False
+            self.panel_ui.set_orders(self._orders_df)
+        self._update_data_age()
+
+    @pyqtSlot()
+    def _update_data_age(self):
+        """Shows when the shown orders were fetched, and how old they are"""
+        if self._orders_fetched_at is None:
+            self._data_age_label.setText('Sin datos')
+            return
+        minutes = int((datetime.now(timezone.utc)
+                       - self._orders_fetched_at).total_seconds() // 60)
+        fetched_at = self._orders_fetched_at.astimezone().strftime('%H:%M')
+        self._data_age_label.setText(
+            f'Datos de las {fetched_at}, hace ' + (
+                'menos de 1 min' if minutes < 1
+                else f'{minutes} min' if minutes < 60
+                else f'{minutes//60} h {minutes%60} min'))
+
+    @pyqtSlot()
+    def _update_metrics(self):
+        """
+        Shows the changes not written yet, the latency of the last sync
+        stages, and exports metrics if configured to
+        """
+        def latency(name):
+            seconds = METRICS.last(f'{name}_seconds')
+            return '-' if seconds is None else f'{seconds*1000:.0f} ms'
+        self._metrics_label.setText(
+            f'Pendientes {self._journal.count()} · '
+            f'Lectura {latency("read_ss")} · '
+            f'Escritura {latency("update_ss")} · '
+            f'Pintado {latency("set_orders")}')
+        if self.config.get('METRICS_FILE'):
+            try:
+                METRICS.write_prometheus(self.config['METRICS_FILE'])
+            except OSError as err:
+                print(err)
 
     @pyqtSlot()
     def _retriever_slot(self):
@@ -165,18 +468,45 @@ class ReproUIApp(QMainWindow):
         Wrapper to call ._read_ss() periodically and update local orders on the
         app
         """
+        if self._sync.fetch_in_flight:
+            # Its result schedules the next one
+            return
+        if not self._scheduler.try_read():
+            # Over the rate limit, or what is left is kept for writes
+            self._retrieve_interval_timer.start(
+                _msecs(self._scheduler.read_wait()))
+            return
         self._fetch_orders_and_update_panel()
 
-    def _order_interaction(self, row, cb_id: int, cb_checked: bool):
+    def _order_interaction(self, row_ids: list, cb_id: int, cb_checked: bool):
         """
         cb_id is an `int`, but is inverse-searched for the `constants.CBId` equivalent
         """
-        if row is not None:
-            self._orders_df.loc[row, constants.CBId(cb_id).name] = cb_checked
-            self._update_delay_timer.start()
+        if row_ids:
+            # Shown orders were already changed by the panel
+            col = constants.CBId(cb_id).name
+            # All of them in one write
+            self._journal.append_many(
+                [(row_id, col, cb_checked) for row_id in row_ids])
+            # Restarted by every click, but not past the first one's deadline
+            self._scheduler.clicked()
+            self._update_delay_timer.start(
+                _msecs(self._scheduler.write_delay()))
+            self._update_metrics()
+
+    def closeEvent(self, a0: QCloseEvent) -> None:  # pylint: disable=invalid-name, missing-function-docstring
+        self._sync.stop()
+        stop_credentials()
+        super().closeEvent(a0)
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    reproui_app = ReproUIApp(None)
+    arg_parser = argparse.ArgumentParser(description=__doc__)
+    arg_parser.add_argument(
+        '--profile-startup', action='store_true',
+        help='print how long each startup phase took, and quit')
+    # Others are left to Qt
+    args, qt_args = arg_parser.parse_known_args()
+    app = QApplication(sys.argv[:1] + qt_args)
+    reproui_app = ReproUIApp(None, profile_startup=args.profile_startup)
     reproui_app.show()
     sys.exit(app.exec())
@@ -0,0 +1,18 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__doc__ = """Offline benchmarks of ReproUI hot paths.
+Run them from the repository root, e.g. `python -m benchmarks.sheets_service`"""
@@ -0,0 +1,73 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Peak memory and time (slowed down by tracing memory) of exporting
+every order as CSV with the command line tool, reading the sheet in chunks
+vs. as a whole."""
+
+import argparse
+import os
+import time
+import tracemalloc
+
+from order_sources import SHEET_NAME
+from order_store import GoogleSheetsOrderStore
+from orders_cli import CHUNK_SIZE, export_orders
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_sheet
+
+
+def _measure(func) -> tuple[float, float]:
+    """Seconds taken by func, and its peak memory in MiB"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 2**20
+
+
+def main() -> None:
+    """Runs the benchmark and prints time and peak memory of each size"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[5000, 20000, 50000])
+    args = parser.parse_args()
+
+    print(f'{"orders":>8}{"chunked":>22}{"whole sheet":>22}')
+    for n_orders in args.sizes:
+        store = GoogleSheetsOrderStore(
+            FakeSheetsBackend(synthetic_sheet(n_orders)), SHEET_NAME)
+        with open(os.devnull, 'w', encoding='utf-8') as output:
+            chunked = _measure(lambda: export_orders(
+                store.read_chunks(CHUNK_SIZE), output, 'csv',
+                pending_only=False))
+            whole = _measure(lambda: export_orders(
+                iter([store.read()]), output, 'csv', pending_only=False))
+        print(f'{n_orders:>8}'
+              + ''.join(f'{seconds*1000:>10.0f} ms {peak:>6.1f} MiB'
+                        for seconds, peak in (chunked, whole)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,156 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """In-memory stand-in for GoogleSpreadSheetInterface, which counts the
+requests made and the bytes they would transfer"""
+
+import json
+import re
+import threading
+import time
+
+_A1_RE = re.compile(r'^(?:(?P<sheet>[^!]+)!)?'
+                    r'(?P<col1>[A-Z]+)(?P<row1>\d*)'
+                    r'(?::(?P<col2>[A-Z]+)(?P<row2>\d*))?$')
+
+
+def _col_number(col: str) -> int:
+    number = 0
+    for char in col:
+        number = number * 26 + ord(char) - ord('A') + 1
+    return number - 1
+
+
+def _payload_size(payload) -> int:
+    return len(json.dumps(payload).encode('utf-8'))
+
+
+class FakeSheetsBackend:
+    """
+    Holds the rows of a sheet (rows[0] is sheet row 1) and serves reads and
+    writes like GoogleSpreadSheetInterface does: trailing empty cells and rows
+    are not returned. Ranges of sheets added with add_sheet go to their rows,
+    any other to rows. Each request takes latency seconds, like the network
+    """
+    def __init__(self, rows: list[list], latency: float = 0.) -> None:
+        self.rows = [list(row) for row in rows]
+        self.sheets = {}
+        self.latency = latency
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    def add_sheet(self, sheet_name: str, rows: list[list]) -> None:
+        """Adds a sheet, with its own rows"""
+        self.sheets[sheet_name] = [list(row) for row in rows]
+
+    def reset_counters(self) -> None:
+        """Zeroes the request and transferred bytes counters"""
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.requests = 0
+
+    def _sheet_rows(self, range_: str) -> list[list]:
+        return self.sheets.get(_A1_RE.match(range_)['sheet'], self.rows)
+
+    @staticmethod
+    def _bounds(range_: str) -> tuple[int, int, int, int | None]:
+        match = _A1_RE.match(range_)
+        if match is None:
+            raise ValueError(f'Unsupported range {range_}')
+        col1 = _col_number(match['col1'])
+        col2 = _col_number(match['col2']) if match['col2'] else col1
+        row1 = int(match['row1']) - 1 if match['row1'] else 0
+        if match['col2'] is None:
+            row2 = row1 + 1
+        else:
+            row2 = int(match['row2']) if match['row2'] else None
+        return row1, row2, col1, col2 + 1
+
+    def _get(self, range_: str) -> list[list]:
+        row1, row2, col1, col2 = self._bounds(range_)
+        values = [row[col1:col2] for row in self._sheet_rows(range_)[row1:row2]]
+        # Trim trailing empty cells, then trailing empty rows
+        values = [row[:max((i + 1 for i, cell in enumerate(row)
+                            if cell not in ('', None)), default=0)]
+                  for row in values]
+        while values and not values[-1]:
+            values.pop()
+        return values
+
+    def _set(self, range_: str, values: list[list]) -> None:
+        row1, _, col1, _ = self._bounds(range_)
+        rows = self._sheet_rows(range_)
+        for i, row_values in enumerate(values):
+            while len(rows) <= row1 + i:
+                rows.append([])
+            row = rows[row1 + i]
+            for j, value in enumerate(row_values):
+                while len(row) <= col1 + j:
+                    row.append('')
+                # USER_ENTERED parses booleans
+                row[col1 + j] = {'True': True, 'False': False}.get(
+                    value, value)
+
+    def read_range(self, range_: str) -> list[list]:  # pylint: disable=missing-function-docstring
+        time.sleep(self.latency)
+        with self._lock:
+            values = self._get(range_)
+            self.requests += 1
+            self.bytes_read += _payload_size(values)
+        return values
+
+    def read_ranges(self, ranges: list[str]) -> list[list[list]]:  # pylint: disable=missing-function-docstring
+        time.sleep(self.latency)
+        with self._lock:
+            values = [self._get(range_) for range_ in ranges]
+            self.requests += 1
+            self.bytes_read += _payload_size(values)
+        return values
+
+    def update_range(self, range_: str, values: list[list]) -> dict:  # pylint: disable=missing-function-docstring
+        time.sleep(self.latency)
+        with self._lock:
+            self._set(range_, values)
+            self.requests += 1
+            self.bytes_written += _payload_size(values)
+        return {'updatedRange': range_}
+
+    def batch_update_ranges(self, data: dict[str, list[list]],
+                            include_values: bool = False) -> dict:  # pylint: disable=missing-function-docstring
+        time.sleep(self.latency)
+        with self._lock:
+            for range_, values in data.items():
+                self._set(range_, values)
+            self.requests += 1
+            self.bytes_written += _payload_size(data)
+            response = {'totalUpdatedCells': sum(
+                len(row) for values in data.values() for row in values)}
+            if include_values:
+                response['responses'] = [
+                    {'updatedRange': range_,
+                     'updatedData': {'range': range_,
+                                     'values': self._get(range_)}}
+                    for range_ in data]
+                self.bytes_read += _payload_size(response['responses'])
+        return response
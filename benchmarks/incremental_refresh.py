@@ -0,0 +1,87 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Bytes transferred per refresh, full vs. incremental, against an
+in-memory fake Sheets backend. Also checks the incremental result matches a
+full read, after checkboxes and columns filled in by the staff change."""
+
+import argparse
+import random
+
+from order_sources import SHEET_NAME
+from incremental_sync import IncrementalOrderSync
+from order_store import GoogleSheetsOrderStore
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_row, synthetic_sheet
+
+
+def _full_read(backend: FakeSheetsBackend):
+    return GoogleSheetsOrderStore(backend, SHEET_NAME).read()
+
+
+def _measure(name: str, backend: FakeSheetsBackend,
+             order_sync: IncrementalOrderSync) -> None:
+    backend.reset_counters()
+    incremental = order_sync.fetch()
+    incremental_bytes = backend.bytes_read
+    incremental_requests = backend.requests
+    backend.reset_counters()
+    full = _full_read(backend)
+    assert incremental.equals(full), 'Incremental and full reads differ'
+    print(f'{name:<24} full {backend.bytes_read:>10} B   '
+          f'incremental {incremental_bytes:>10} B '
+          f'in {incremental_requests} requests')
+
+
+def main() -> None:
+    """Runs the benchmark and prints the bytes read per refresh"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=5000)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    backend = FakeSheetsBackend(synthetic_sheet(args.orders))
+    order_sync = IncrementalOrderSync(
+        GoogleSheetsOrderStore(backend, SHEET_NAME))
+
+    _measure('first refresh', backend, order_sync)
+    _measure('nothing changed', backend, order_sync)
+    # Flip APPROVED of sheet row 10 and PRINTED of sheet row 11
+    backend.batch_update_ranges({
+        'Q10': [[str(not backend.rows[9][16])]],
+        'R11': [[str(not backend.rows[10][17])]]
+    })
+    _measure('2 checkboxes changed', backend, order_sync)
+    # PRINTER, PRICE and REPRO_COMMENTS of sheet row 45
+    backend.batch_update_ranges({
+        'L45': [['Otra impresora']],
+        'P45': [[99.5]],
+        'W45': [['Revisado']]
+    })
+    _measure('staff columns changed', backend, order_sync)
+    backend.rows.extend(synthetic_row(args.orders + i, rng)
+                        for i in range(5))
+    _measure('5 new orders', backend, order_sync)
+
+
+if __name__ == '__main__':
+    main()
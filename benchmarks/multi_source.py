@@ -0,0 +1,94 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Refresh latency of several print queues, in spreadsheets with
+different latencies, read concurrently vs. one after the other. Also checks
+each spreadsheet is read with a single request, whatever its sheets."""
+
+import argparse
+import time
+
+from incremental_sync import IncrementalOrderSync
+from order_store import GoogleSheetsOrderStore, MultiOrderStore
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_sheet
+
+
+def _timed(func) -> tuple[float, object]:
+    start = time.perf_counter()
+    result = func()
+    return time.perf_counter() - start, result
+
+
+def main() -> None:
+    """Runs the benchmark and prints the refresh latencies"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=2000,
+                        help='orders per sheet')
+    parser.add_argument('--latencies', type=float, nargs='+',
+                        default=[0.05, 0.1, 0.15],
+                        help='latency of each spreadsheet, in seconds')
+    args = parser.parse_args()
+
+    stores = []
+    backends = []
+    for number, latency in enumerate(args.latencies):
+        backend = FakeSheetsBackend([], latency=latency)
+        # Two queues in the first spreadsheet, one in the others
+        sheet_names = ['Cola1', 'Cola2'] if number == 0 else ['Cola1']
+        for seed, sheet_name in enumerate(sheet_names):
+            backend.add_sheet(sheet_name, synthetic_sheet(
+                args.orders, seed=10*number + seed))
+        backends.append(backend)
+        stores.append((GoogleSheetsOrderStore(backend, *sheet_names),
+                       [f'{number}/{sheet_name}'
+                        for sheet_name in sheet_names]))
+    multi_store = MultiOrderStore(stores)
+
+    sequential, _ = _timed(lambda: [store.read() for store, _ in stores])
+    for backend in backends:
+        backend.reset_counters()
+    concurrent, orders_df = _timed(multi_store.read)
+    print(f'{len(orders_df)} orders from {len(stores)} spreadsheets, '
+          f'slowest {max(args.latencies)*1000:.0f} ms per request')
+    print(f'full read, one after the other {sequential*1000:8.0f} ms')
+    print(f'full read, concurrent          {concurrent*1000:8.0f} ms   '
+          f'requests per spreadsheet: '
+          f'{[backend.requests for backend in backends]}')
+
+    order_sync = IncrementalOrderSync(multi_store)
+    order_sync.fetch()
+    # A checkbox changes in every queue
+    multi_store.write_cells({(row_id, 'APPROVED'): True
+                             for row_id in orders_df.index[::args.orders]})
+    for backend in backends:
+        backend.reset_counters()
+    refresh, incremental = _timed(order_sync.fetch)
+    print(f'incremental refresh, concurrent{refresh*1000:8.0f} ms   '
+          f'requests per spreadsheet: '
+          f'{[backend.requests for backend in backends]}')
+    assert incremental.equals(multi_store.read()), \
+        'Incremental and full reads differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Benchmark of the SQLite order store: full reads, reads of what
+changed since the last revision, and cell writes, with tens of thousands of
+orders."""
+
+import argparse
+import os
+import tempfile
+import time
+
+from order_sources import SHEET_NAME
+from incremental_sync import IncrementalOrderSync
+from order_store import GoogleSheetsOrderStore, SqliteOrderStore
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_sheet
+
+
+def _timed(name: str, func):
+    start = time.perf_counter()
+    result = func()
+    print(f'{name:<28} {(time.perf_counter() - start)*1000:>9.2f} ms')
+    return result
+
+
+def main() -> None:
+    """Runs the benchmark and prints the time taken by each operation"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=50000)
+    args = parser.parse_args()
+
+    orders_df = GoogleSheetsOrderStore(
+        FakeSheetsBackend(synthetic_sheet(args.orders)), SHEET_NAME).read()
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        order_store = SqliteOrderStore(os.path.join(tmp_dir, 'orders.db'))
+        _timed(f'import {len(orders_df)} orders',
+               lambda: order_store.replace(orders_df))
+        full = _timed('read', order_store.read)
+        assert full.equals(orders_df), 'Stored and imported orders differ'
+
+        order_sync = IncrementalOrderSync(order_store)
+        _timed('first refresh', order_sync.fetch)
+        _timed('refresh, nothing changed', order_sync.fetch)
+        rows = orders_df.index[::1000]
+        _timed(f'write {len(rows)} cells', lambda: order_store.write_cells(
+            {(row, 'PAID'): not orders_df.at[row, 'PAID'] for row in rows}))
+        incremental = _timed(f'refresh, {len(rows)} changed',
+                             order_sync.fetch)
+        assert incremental.equals(order_store.read()), \
+            'Incremental and full reads differ'
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Per-click and per-toggle cost of the order panel: looking up the
+clicked order and showing it, and changing one of its checkboxes, with the
+orders in a DataFrame vs. in an OrderTable."""
+
+import argparse
+import itertools
+import os
+import statistics
+import time
+
+# pylint: disable=no-name-in-module, wrong-import-position
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+
+from benchmarks.synthetic import synthetic_sheet
+from order_table import OrderTable
+from orders_parsing import parse_orders
+from panel_ui import PanelUI
+# pylint: enable=no-name-in-module, wrong-import-position
+
+
+def _time(func, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    """Runs the benchmark and prints the median times"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=10000)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    q_app = QApplication([])  # pylint: disable=unused-variable
+    orders_df = parse_orders(synthetic_sheet(args.orders,
+                                             pending_ratio=1.)[1:])
+    orders = OrderTable(orders_df)
+    panel = PanelUI(None, lambda *_: None)
+    controls = panel.orders_and_controls
+    row_ids = itertools.cycle(orders.row_ids[:args.repeats])
+    flags = itertools.cycle([True, False])
+
+    cases = {
+        'click, DataFrame': lambda: controls.change_order(
+            orders_df.loc[next(row_ids)]),
+        'click, OrderTable': lambda: controls.change_order(
+            orders.row(next(row_ids))),
+        'lookup, DataFrame': lambda: orders_df.loc[next(row_ids)],
+        'lookup, OrderTable': lambda: orders.row(next(row_ids)),
+    }
+
+    def toggle_df():
+        orders_df.loc[next(row_ids), 'PAID'] = next(flags)
+
+    def toggle_table():
+        orders.set(next(row_ids), 'PAID', next(flags))
+    cases['toggle, DataFrame'] = toggle_df
+    cases['toggle, OrderTable'] = toggle_table
+
+    print(f'{args.orders} orders')
+    for name, func in cases.items():
+        print(f'{name:<20} {_time(func, args.repeats)*1e6:10.1f} us')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Parse time and DataFrame memory of the orders, row by row with
+object dtypes (old _read_ss) vs. column by column with typed dtypes"""
+
+import argparse
+import time
+
+import pandas as pd
+
+import constants
+from benchmarks.synthetic import synthetic_sheet
+from orders_parsing import parse_orders
+
+
+def _legacy_parse(orders_raw: list[list]) -> pd.DataFrame:
+    """What _read_ss used to do"""
+    orders_df = pd.DataFrame(
+        columns=constants.COLUMN_NAMES,
+        data=[order+[''] if len(order) == 22 else order
+              for order in orders_raw]
+        )
+    orders_df = (orders_df
+                 .astype({'TEMP': 'datetime64[ns]', 'TEF': object})
+                 .dropna(thresh=18)
+                 )
+
+    def privacy_protect_name(name):
+        name_splitted = name.split()
+        return ' '.join([name_splitted[0]] + [nm[:1].upper()+'.'
+                        for nm in name_splitted[1:]])
+    orders_df['NAME'] = orders_df['NAME'].map(privacy_protect_name)
+    return orders_df
+
+
+def _best_time(func, repeats: int) -> tuple[float, pd.DataFrame]:
+    best = float('inf')
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main() -> None:
+    """Runs the benchmark and prints parse times and memory"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=50000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    rows = synthetic_sheet(args.orders)[1:]
+    for name, func in (('row by row, object dtypes', _legacy_parse),
+                       ('column by column, typed', parse_orders)):
+        seconds, orders_df = _best_time(lambda f=func: f(rows), args.repeats)
+        memory = orders_df.memory_usage(deep=True).sum()
+        print(f'{name:<28} {seconds*1000:9.1f} ms   '
+              f'{memory/2**20:8.1f} MiB')
+
+    legacy_names = _legacy_parse(rows)['NAME']
+    assert legacy_names.equals(parse_orders(rows)['NAME']), \
+        'Anonymized names differ'
+
+
+if __name__ == '__main__':
+    main()
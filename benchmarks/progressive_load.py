@@ -0,0 +1,78 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Time until the newest orders can be shown, and until all of them
+are read, when the sheet is read newest first in chunks (as the first fetch
+with nothing cached does) vs. in a single request."""
+
+import argparse
+import time
+
+import pandas as pd
+
+from app import LOAD_CHUNK_SIZE
+from order_sources import SHEET_NAME
+from order_store import GoogleSheetsOrderStore
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_sheet
+
+
+def main() -> None:
+    """Runs the benchmark and prints the load times"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[5000, 20000, 80000],
+                        help='orders in the sheet')
+    parser.add_argument('--chunk-size', type=int, default=LOAD_CHUNK_SIZE)
+    parser.add_argument('--latency', type=float, default=0.15,
+                        help='latency of each request, in seconds')
+    args = parser.parse_args()
+
+    print(f'{"Orders":>8}{"Whole sheet":>14}{"First chunk":>14}'
+          f'{"All chunks":>14}{"Requests":>10}')
+    for n_orders in args.sizes:
+        backend = FakeSheetsBackend(synthetic_sheet(n_orders),
+                                    latency=args.latency)
+        order_store = GoogleSheetsOrderStore(backend, SHEET_NAME)
+
+        start = time.perf_counter()
+        orders_df = order_store.read()
+        whole = time.perf_counter() - start
+
+        backend.reset_counters()
+        start = time.perf_counter()
+        first = None
+        chunks = []
+        for chunk in order_store.read_chunks(args.chunk_size,
+                                             newest_first=True):
+            chunks.append(chunk)
+            if first is None:
+                first = time.perf_counter() - start
+        chunked = time.perf_counter() - start
+        print(f'{n_orders:>8}{whole*1000:>11.0f} ms{first*1000:>11.0f} ms'
+              f'{chunked*1000:>11.0f} ms{backend.requests:>10}')
+        assert pd.concat(chunks).sort_index().index.equals(orders_df.index), \
+            'Chunked and whole reads differ'
+
+
+if __name__ == '__main__':
+    main()
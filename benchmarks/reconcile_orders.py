@@ -0,0 +1,103 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Time of PanelUI.set_orders reconciling a refresh where a few
+orders changed, vs. a full rebuild (model reset) of the list. Includes the
+repaint of the visible orders."""
+
+import argparse
+import os
+import statistics
+import time
+
+# pylint: disable=no-name-in-module, wrong-import-position
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+
+from benchmarks.synthetic import synthetic_sheet
+from order_table import OrderTable
+from orders_parsing import parse_orders
+from panel_ui import PanelUI
+# pylint: enable=no-name-in-module, wrong-import-position
+
+
+def _full_rebuild(panel: PanelUI, orders_df) -> None:
+    """What set_orders did before reconciling: reset the whole model"""
+    # pylint: disable=protected-access
+    model = panel.orders_model
+    model.beginResetModel()
+    model._orders = OrderTable(
+        orders_df, (orders_df['COMPLETION'] != 1).to_numpy())
+    model._row_ids = model._orders.row_ids[::-1]
+    model._texts = {}
+    model.endResetModel()
+
+
+def _time(func, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    """Runs the benchmark and prints the median times"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--orders', type=int, default=1000)
+    parser.add_argument('--changed', type=float, default=0.01)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    q_app = QApplication([])  # pylint: disable=unused-variable
+    sheet = synthetic_sheet(args.orders, pending_ratio=1.)
+    orders_df = parse_orders(sheet[1:])
+    panel = PanelUI(None, lambda *_: None)
+    panel.resize(700, 800)
+    panel.show()
+    panel.set_orders(orders_df)
+
+    # Two refreshes alternate, as otherwise only the first would differ
+    changed_df = orders_df.copy()
+    step = max(1, int(1 / args.changed))
+    changed_df.loc[changed_df.index[::step], 'COMMENT'] = 'Cambiado'
+
+    frames = [changed_df, orders_df]
+
+    def reconcile():
+        panel.set_orders(frames[0])
+        panel.orders_list.viewport().repaint()
+        frames.reverse()
+
+    def rebuild():
+        _full_rebuild(panel, frames[0])
+        panel.orders_list.viewport().repaint()
+        frames.reverse()
+
+    print(f'{args.orders} orders, {len(orders_df.index[::step])} changed')
+    print(f'full rebuild   {_time(rebuild, args.repeats)*1000:8.2f} ms')
+    print(f'reconcile      {_time(reconcile, args.repeats)*1000:8.2f} ms')
+
+
+if __name__ == '__main__':
+    main()
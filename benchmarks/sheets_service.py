@@ -0,0 +1,146 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Micro-benchmark of per-call Sheets API latency, building the
+service on every call (old behaviour) vs. the shared service and connection
+pool of GoogleSpreadSheetInterface. Runs against a local stand-in server."""
+
+import argparse
+import json
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from google.auth.credentials import AnonymousCredentials
+from googleapiclient.discovery import build
+
+from google_flow import GoogleSpreadSheetInterface
+
+ROW = [
+    '10/05/2012 00:00:00', 'correo@serv.com', 'Nombre A.', '600000000',
+    'about:blank', '0.2 mm', 3, 'PLA Negro', 'Comentario', True,
+    'Me doy por enterado', 'Prusa', True, 10, 60, 1.5,
+    True, False, False, False, 0.25, 1, ''
+]
+
+
+class _StandInSheetsHandler(BaseHTTPRequestHandler):
+    # Keep-alive needs HTTP/1.1 and an explicit Content-Length
+    protocol_version = 'HTTP/1.1'
+    # Otherwise delayed ACKs dominate the measured latency
+    disable_nagle_algorithm = True
+    rows = 100
+
+    def _reply(self, payload: dict) -> None:
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:  # pylint: disable=invalid-name, missing-function-docstring
+        self._reply({'range': 'HojaA!A2:W',
+                     'majorDimension': 'ROWS',
+                     'values': [ROW] * self.rows})
+
+    def do_PUT(self) -> None:  # pylint: disable=invalid-name, missing-function-docstring
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self._reply({'updatedCells': 4})
+
+    # batchUpdate and batchGet
+    do_POST = do_PUT  # pylint: disable=invalid-name
+
+    def log_message(self, format, *args) -> None:  # pylint: disable=redefined-builtin
+        pass
+
+
+class _LocalSpreadSheetInterface(GoogleSpreadSheetInterface):
+    """GoogleSpreadSheetInterface pointed to the stand-in server"""
+    def __init__(self, *, endpoint: str) -> None:
+        self._endpoint = endpoint
+        super().__init__(credentials=AnonymousCredentials(),
+                         spreadsheet_id='benchmark')
+
+    def _build_service(self):
+        return build('sheets', 'v4', credentials=self._creds,
+                     static_discovery=True, cache_discovery=False,
+                     client_options={'api_endpoint': self._endpoint})
+
+
+def _read_building_every_call(endpoint: str) -> list[list]:
+    """What read_range used to do on every call"""
+    service = build('sheets', 'v4', credentials=AnonymousCredentials(),
+                    client_options={'api_endpoint': endpoint})
+    return service.spreadsheets().values().get(
+        spreadsheetId='benchmark',
+        range='HojaA!A2:W',
+        majorDimension='ROWS',
+        valueRenderOption='UNFORMATTED_VALUE',
+        dateTimeRenderOption='FORMATTED_STRING'
+    ).execute().get('values', [])
+
+
+def _time_calls(func, calls: int) -> list[float]:
+    func()  # Warm-up
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def _report(name: str, latencies: list[float]) -> None:
+    print(f'{name:<28} '
+          f'mean {statistics.mean(latencies)*1000:8.2f} ms   '
+          f'median {statistics.median(latencies)*1000:8.2f} ms   '
+          f'max {max(latencies)*1000:8.2f} ms')
+
+
+def main() -> None:
+    """Runs the benchmark and prints per-call latencies"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--calls', type=int, default=50)
+    parser.add_argument('--rows', type=int, default=100)
+    args = parser.parse_args()
+
+    _StandInSheetsHandler.rows = args.rows
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _StandInSheetsHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    endpoint = f'http://127.0.0.1:{server.server_address[1]}'
+
+    try:
+        interface = _LocalSpreadSheetInterface(endpoint=endpoint)
+        _report('build() on every call',
+                _time_calls(lambda: _read_building_every_call(endpoint),
+                            args.calls))
+        _report('shared service + pool',
+                _time_calls(lambda: interface.read_range('HojaA!A2:W'),
+                            args.calls))
+    finally:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Render and update time of the selected order panel, styled by
+styles.qss vs. by inline stylesheets on its labels, as it was before."""
+
+import argparse
+import itertools
+import os
+import statistics
+import time
+
+# pylint: disable=no-name-in-module, wrong-import-position
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication, QWidget, QVBoxLayout
+
+from benchmarks.synthetic import synthetic_sheet
+from order_table import OrderTable
+from orders_parsing import parse_orders
+from panel_ui import _OrderBaseElement, _order_texts
+# pylint: enable=no-name-in-module, wrong-import-position
+
+
+class _InlineStyledElement(_OrderBaseElement):
+    """_OrderBaseElement as it was, styling its labels inline"""
+    def __init__(self, parent, properties) -> None:
+        super().__init__(parent, properties)
+        self.label_ref.setStyleSheet(
+            "font-weight: bold;"
+            "font-size: 18px;"
+        )
+        self.label_name.setStyleSheet(
+            "font-size: 18px;"
+        )
+
+    def set_data(self, properties):
+        super().set_data(properties)
+        member_state = _order_texts(properties)['member_state']
+        self.label_member.setStyleSheet(
+            "color: black;" if(member_state is True)
+            else "color: red;" if(member_state is False)
+            else "color: None;"  # if(member_state is None)
+        )
+
+
+def _time(func, repeats: int) -> float:
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append(time.perf_counter() - start)
+    return statistics.median(latencies)
+
+
+def main() -> None:
+    """Runs the benchmark and prints the median times"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeats', type=int, default=200)
+    args = parser.parse_args()
+
+    q_app = QApplication([])  # pylint: disable=unused-variable
+    orders = OrderTable(parse_orders(synthetic_sheet(200,
+                                                     pending_ratio=1.)[1:]))
+    rows = [orders.row(row_id) for row_id in orders.row_ids]
+    by_state = {}
+    for row in rows:
+        by_state.setdefault(_order_texts(row)['member_state'], []).append(row)
+    # Every update changes the membership state, or none does
+    alternating = itertools.cycle(
+        [by_state[True][0], by_state[False][0], by_state[None][0]])
+    same_state = itertools.cycle(by_state[True])
+
+    window = QWidget()
+    with open(os.path.join('assets', 'styles', 'styles.qss'), 'r',
+              encoding='utf-8') as style_fl:
+        window.setStyleSheet(style_fl.read())
+    layout = QVBoxLayout(window)
+    window.show()
+
+    for name, element_class in (('inline styles', _InlineStyledElement),
+                                ('styles.qss', _OrderBaseElement)):
+        def render():
+            element = element_class(window, rows[0])
+            layout.addWidget(element)
+            element.repaint()
+            element.deleteLater()
+            layout.removeWidget(element)
+        element = element_class(window, rows[0])
+        layout.addWidget(element)
+
+        def update(orders_iter):
+            element.set_data(next(orders_iter))
+            element.repaint()
+        print(f'{name}')
+        print(f'  render              {_time(render, args.repeats)*1e3:8.3f} ms')
+        print(f'  update, same state  '
+              f'{_time(lambda: update(same_state), args.repeats)*1e3:8.3f} ms')
+        print(f'  update, new state   '
+              f'{_time(lambda: update(alternating), args.repeats)*1e3:8.3f} ms')
+        layout.removeWidget(element)
+        element.deleteLater()
+        q_app.processEvents()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,226 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Headless benchmark suite of the app hot paths, against synthetic
+order sheets served by a fake spreadsheet interface. Each sheet size runs in
+its own process, so peak memory is measured per size. Results are saved as
+JSON, and can be compared with a previous run."""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# pylint: disable=no-name-in-module, wrong-import-position
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+from PyQt6.QtWidgets import QApplication
+
+from app import ReproUIApp
+from order_sources import SHEET_NAME
+from order_store import GoogleSheetsOrderStore
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_sheet
+# pylint: enable=no-name-in-module, wrong-import-position
+
+DEFAULT_SIZES = [100, 1000, 10000]
+BENCH_CONFIG = {
+    # Timers never fire during the benchmark, it drives the app itself
+    'DB_UPDATE_DELAY': 3600,
+    'DB_RETRIEVE_INTERVAL': 3600,
+    'SPREADSHEET_ID': 'benchmark',
+}
+
+
+def _timings(func, repeats: int) -> dict:
+    """Runs func repeats times, returns median and min times in ms"""
+    latencies = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {'median_ms': statistics.median(latencies),
+            'min_ms': min(latencies)}
+
+
+def _peak_rss_mib() -> float | None:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, KiB elsewhere
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 2**10
+
+
+def _wait_for_first_fetch(reproui: ReproUIApp, timeout: float = 60) -> None:
+    # pylint: disable=protected-access
+    deadline = time.monotonic() + timeout
+    while reproui._orders_fetched_at is None:
+        if time.monotonic() > deadline:
+            raise TimeoutError('First fetch did not finish')
+        QApplication.processEvents()
+        time.sleep(0.01)
+
+
+def run_size(n_orders: int, repeats: int) -> dict:
+    """Benchmarks every hot path with a sheet of n_orders orders"""
+    # pylint: disable=protected-access
+    q_app = QApplication.instance() or QApplication([])
+    backend = FakeSheetsBackend(synthetic_sheet(n_orders))
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        order_store = GoogleSheetsOrderStore(backend, SHEET_NAME)
+        reproui = ReproUIApp(None, config=BENCH_CONFIG,
+                             order_store=order_store,
+                             cache_path=os.path.join(tmp_dir, 'cache.db'),
+                             journal_path=os.path.join(tmp_dir, 'journal.db'))
+        reproui._retrieve_interval_timer.stop()
+        reproui.resize(700, 800)
+        reproui.show()
+        _wait_for_first_fetch(reproui)
+        panel = reproui.panel_ui
+        results = {'pending_orders': panel.orders_model.rowCount()}
+
+        # Every order read and cached, as on the first fetch. Comparable with
+        # results from before refreshes read only from the watermark on
+        results['read_ss'] = _timings(
+            lambda: reproui._order_cache.save(order_store.read()), repeats)
+        results['read_ss_refresh'] = _timings(reproui._read_ss, repeats)
+
+        # A refresh where 1% of the orders changed, alternating with the
+        # original so each call has something to update
+        orders_df = reproui._read_ss()
+        changed_df = orders_df.copy()
+        changed_df.loc[changed_df.index[::100], 'COMMENT'] = 'Cambiado'
+        frames = [changed_df, orders_df]
+
+        def set_orders():
+            panel.set_orders(frames[0])
+            panel.orders_list.viewport().repaint()
+            frames.reverse()
+        results['set_orders'] = _timings(set_orders, repeats)
+
+        orders_iter = itertools.cycle([
+            panel.orders.row(row_id)
+            for row_id in panel.orders.row_ids[:repeats]])
+        results['change_order'] = _timings(
+            lambda: panel.orders_and_controls.change_order(next(orders_iter)),
+            repeats)
+
+        # Typing and then erasing a name, one keystroke at a time
+        keystrokes = itertools.cycle(
+            ['l', 'lu', 'luc', 'luci', 'lucia', 'lucia ', 'lucia g',
+             'lucia', 'luc', 'l', ''])
+
+        def filter_keystroke():
+            panel.filter_bar.search_edit.setText(next(keystrokes))
+            panel.orders_list.viewport().repaint()
+        results['filter_keystroke'] = _timings(filter_keystroke, repeats)
+        panel.filter_bar.search_edit.clear()
+
+        row_id = panel.orders.row_ids[-1]
+        panel._on_order_click_event(row_id)
+
+        def toggle_and_update():
+            panel.orders_and_controls._paid_cb.click()
+            reproui._update_delay_timer.stop()
+            reproui._update_ss(reproui._journal.pending())
+        results['toggle_update_ss'] = _timings(toggle_and_update, repeats)
+
+        reproui._sync.stop()
+        reproui.close()
+    q_app.processEvents()
+    results['peak_rss_mib'] = _peak_rss_mib()
+    return results
+
+
+def _print_results(results: dict, baseline: dict | None) -> None:
+    for size, metrics in results.items():
+        print(f'{size} orders ({metrics["pending_orders"]} pending)')
+        for name, value in metrics.items():
+            if name == 'pending_orders':
+                continue
+            current = value['median_ms'] if isinstance(value, dict) else value
+            unit = 'ms' if isinstance(value, dict) else 'MiB'
+            line = f'  {name:<18}' + (
+                f'{current:10.2f} {unit}' if current is not None else '       n/a')
+            old = (baseline or {}).get(size, {}).get(name)
+            if old is not None and current:
+                old = old['median_ms'] if isinstance(old, dict) else old
+                line += f'   x{current/old:.2f} vs. baseline' if old else ''
+            print(line)
+
+
+def main() -> None:
+    """Runs every size in its own process, saves and prints the results"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=DEFAULT_SIZES)
+    parser.add_argument('--repeats', type=int, default=20)
+    parser.add_argument('--output', default='bench_results.json',
+                        help='JSON file where results are saved')
+    parser.add_argument('--compare', metavar='JSON',
+                        help='results of a previous run to compare with')
+    parser.add_argument('--single', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single is not None:
+        # Child process: print results of a single size for the parent
+        print(json.dumps(run_size(args.single, args.repeats)))
+        return
+
+    results = {}
+    for size in args.sizes:
+        child = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.suite',
+             '--single', str(size), '--repeats', str(args.repeats)],
+            capture_output=True, text=True, check=True)
+        results[str(size)] = json.loads(child.stdout.strip().splitlines()[-1])
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as baseline_file:
+            baseline = json.load(baseline_file)['results']
+    _print_results(results, baseline)
+
+    with open(args.output, 'w', encoding='utf-8') as output_file:
+        json.dump({
+            'date': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeats': args.repeats,
+            'results': results,
+        }, output_file, indent=2)
+    print(f'Results saved to {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Synthetic order sheets, shaped like the ones the form generates"""
+
+import random
+
+import constants
+
+_FIRST_NAMES = ['Ana', 'Luis', 'María', 'Pablo', 'Lucía', 'Javier', 'Sara']
+_SURNAMES = ['García', 'López', 'Martín', 'Sánchez', 'Pérez', 'Gómez',
+             'de la Fuente']
+_MATERIALS = ['PLA Negro', 'PLA Blanco', 'PETG Azul', 'TPU Rojo']
+_PRINTERS = ['Prusa', 'Ender', 'BCN3D', '']
+
+
+def synthetic_row(ref: int, rng: random.Random,
+                  completion: float | None = None) -> list:
+    """
+    One order row as returned by the Sheets API, trailing empty cells trimmed
+    """
+    approved = rng.random() < 0.8
+    printed = approved and rng.random() < 0.6
+    picked_up = printed and rng.random() < 0.5
+    paid = picked_up and rng.random() < 0.8
+    if completion is None:
+        completion = sum((approved, printed, picked_up, paid)) / 4
+    row = [
+        f'{rng.randint(1, 28):02}/{rng.randint(1, 12):02}/2022 '
+        f'{rng.randint(0, 23):02}:{rng.randint(0, 59):02}:00',
+        f'usuario{ref}@alumnos.upm.es',
+        f'{rng.choice(_FIRST_NAMES)} {rng.choice(_SURNAMES)} '
+        f'{rng.choice(_SURNAMES)}',
+        f'6{rng.randint(0, 99999999):08}',
+        f'https://drive.google.com/open?id={ref:08x}',
+        f'{rng.choice((0.1, 0.15, 0.2, 0.3))} mm',
+        rng.randint(1, 5),
+        rng.choice(_MATERIALS),
+        rng.choice(('', 'Lo antes posible', 'Relleno al 20%',
+                    'Pieza para un proyecto de la asignatura')),
+        rng.random() < 0.6,
+        'Me doy por enterado de los métodos de pago',
+        rng.choice(_PRINTERS),
+        rng.choice((True, False, '')),
+        rng.randint(5, 300),
+        rng.randint(10, 900),
+        round(rng.uniform(0.5, 15), 2),
+        approved, printed, picked_up, paid,
+        completion,
+        ref,
+        rng.choice(('', '', 'Avisado por correo')),
+    ]
+    while row and row[-1] == '':
+        row.pop()
+    assert len(row) <= len(constants.COLUMN_NAMES)
+    return row
+
+
+def synthetic_sheet(n_orders: int, pending_ratio: float = 0.1,
+                    seed: int = 0) -> list[list]:
+    """
+    A whole sheet, header row included. The newest pending_ratio of the
+    orders are pending, the older ones are completed
+    """
+    rng = random.Random(seed)
+    n_completed = n_orders - int(n_orders * pending_ratio)
+    return [list(constants.COLUMN_NAMES)] + [
+        synthetic_row(ref, rng, completion=1. if ref < n_completed else None)
+        for ref in range(n_orders)
+    ]
@@ -0,0 +1,91 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Bytes read and time taken by a refresh of sheets with years of
+completed orders and the same pending ones, reading the whole sheet vs. only
+the rows from the pending-row watermark on. Also checks both show the same
+pending orders, and that consecutive watermark refreshes read no more than
+the first one."""
+
+import argparse
+import random
+import time
+
+from order_sources import SHEET_NAME
+from order_store import GoogleSheetsOrderStore
+from pending_sync import PendingOrderSync
+from benchmarks.fake_sheets import FakeSheetsBackend
+from benchmarks.synthetic import synthetic_sheet
+
+COMPLETION_COLUMN = 20
+# Watermark refreshes in a row, after the whole read
+REFRESHES = 5
+
+
+def main() -> None:
+    """Runs the benchmark and prints bytes read and times per refresh"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[5000, 20000, 80000],
+                        help='orders in the sheet')
+    parser.add_argument('--pending', type=int, default=500,
+                        help='newest orders, not all of them pending')
+    parser.add_argument('--stragglers', type=int, default=20,
+                        help='older orders still pending')
+    args = parser.parse_args()
+
+    print(f'{"Orders":>8}{"Whole sheet":>22}{"From watermark":>22}')
+    for n_orders in args.sizes:
+        rows = synthetic_sheet(n_orders, args.pending / n_orders)
+        # Forgotten ones, all over the sheet
+        rng = random.Random(0)
+        for row in rng.sample(range(1, n_orders - args.pending),
+                              args.stragglers):
+            rows[row][COMPLETION_COLUMN] = 0.5
+        backend = FakeSheetsBackend(rows)
+        order_store = GoogleSheetsOrderStore(backend, SHEET_NAME)
+        order_sync = PendingOrderSync(order_store)
+        order_sync.fetch()
+
+        results = []
+        for fetch in [order_store.read] + [order_sync.fetch]*REFRESHES:
+            backend.reset_counters()
+            start = time.perf_counter()
+            orders_df = fetch()
+            results.append((time.perf_counter() - start, backend.bytes_read,
+                            orders_df[orders_df['COMPLETION'] != 1]))
+        # Slowest of the watermark refreshes
+        shown = [results[0], max(results[1:], key=lambda result: result[1])]
+        print(f'{n_orders:>8}' + ''.join(
+            f'{n_bytes/2**10:>10.0f} KiB{took*1000:>7.0f} ms'
+            for took, n_bytes, _ in shown))
+        for _, n_bytes, pending_df in results[1:]:
+            # Categories come from the orders read, compared as values
+            assert pending_df.astype(object).equals(
+                results[0][2].astype(object)), \
+                'Whole and watermark reads show different pending orders'
+            assert n_bytes <= results[1][1], \
+                'Watermark refreshes read more than the first one'
+
+
+if __name__ == '__main__':
+    main()
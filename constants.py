@@ -23,7 +23,6 @@ __status__ = "Prototype"
 __doc__ = "This file contains constants used in the app"
 
 from enum import IntEnum, unique
-from numpy import datetime64
 
 from pandas import Series, Timestamp
 
@@ -53,35 +52,38 @@ COLUMN_NAMES = [
     'REF',
     'REPRO_COMMENTS'
 ]
-# Columns to convert the dtype
-# Commented types is only for reference
-# Fetching with valueRenderOption='UNFORMATTED_VALUE'
-# already gives expected types
+# Dtype of each column, applied when parsing the fetched values
+# Fetching with valueRenderOption='UNFORMATTED_VALUE' gives JSON types, with
+# empty cells as ''. 'boolean' and 'Int64' are nullable: empty cells are NA
 COLUMN_DTYPES = {
-    'TEMP': datetime64,
-    'EMAIL': None,
-    'NAME': None,
-    'TEF': object, # Equeals str
-    'FILE_LINK': None,
-    'LAYER_H': None,
-    'RIGIDITY': None, # int,
-    'COLOUR_MATERIAL': None,
-    'COMMENT': None,
-    'SAYS_IS_MEMBER': None, # bool,
-    'ACCEPTS_PAYING': None,
-    'PRINTER': None,
-    'LOOKUP_MEMBER': None, # bool,
-    'WEIGHT': None,
-    'TIME': None,
-    'PRICE': None,
-    'APPROVED': None, # bool,
-    'PRINTED': None, # bool,
-    'PICKED_UP': None, # bool,
-    'PAID': None, # bool,
-    'COMPLETION': None, # float,
-    'REF': None, # int,
-    'REPRO_COMMENTS': None
+    'TEMP': 'datetime64[ns]',
+    'EMAIL': 'object',  # str
+    'NAME': 'object',  # str
+    'TEF': 'object',  # str
+    'FILE_LINK': 'object',  # str
+    'LAYER_H': 'object',  # str
+    'RIGIDITY': 'category',
+    'COLOUR_MATERIAL': 'category',
+    'COMMENT': 'object',  # str
+    'SAYS_IS_MEMBER': 'boolean',
+    'ACCEPTS_PAYING': 'object',  # str
+    'PRINTER': 'category',
+    'LOOKUP_MEMBER': 'boolean',
+    'WEIGHT': 'float64',
+    'TIME': 'float64',
+    'PRICE': 'float64',
+    'APPROVED': 'bool',
+    'PRINTED': 'bool',
+    'PICKED_UP': 'bool',
+    'PAID': 'bool',
+    'COMPLETION': 'float64',
+    'REF': 'Int64',
+    'REPRO_COMMENTS': 'object'  # str
 }
+# Format of TEMP, fetched with dateTimeRenderOption='FORMATTED_STRING'
+TEMP_FORMAT = '%d/%m/%Y %H:%M:%S'
+# Rows with less cells than this are incomplete, and ignored
+MIN_ROW_CELLS = 18
 # Column A1 notation and name
 A1_TO_COLUMN = {
     'TEMP': 'A',
@@ -108,6 +110,15 @@ A1_TO_COLUMN = {
     'REF': 'V',
     'REPRO_COMMENTS': 'W'
 }
+# Column ranges fetched to tell whether a row has changed since last refresh
+# TEMP is always filled by the form, so it also gives the number of rows.
+# PRINTER to REPRO_COMMENTS are every column filled in by the staff. The
+# form answers, in between, are only edited by hand, and are left to the
+# periodic full reads of incremental_sync.IncrementalOrderSync
+FINGERPRINT_RANGES = [
+    ('TEMP', 'TEMP'),
+    ('PRINTER', 'REPRO_COMMENTS')
+]
 def cols2_a1_notation(col1, col2)  -> str:
     """
     Converts our DF col names to a column range, begins at row 2
@@ -16,94 +16,344 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
 import os.path
+import queue
+import tempfile
 import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
 
+import httplib2
+from google.auth.exceptions import GoogleAuthError
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
+from google_auth_httplib2 import AuthorizedHttp
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
 
+from metrics import METRICS, SIZE_BUCKETS
 
-class GoogleSpreadSheetInterface:
-    # pylint: disable=no-member
-    def __init__(self, *, secrets_path, spreadsheet_id) -> None:
-        self._secrets_path = secrets_path
-        self._spreadsheet_id = spreadsheet_id
-        self._scopes = ['https://www.googleapis.com/auth/spreadsheets']
-        self._action_underway = threading.Lock()
-        # CREDENTIALS INITIALIZATION
-        self._creds_path = os.path.join(self._secrets_path, 'credentials.json')
-        self._token_path = os.path.join(self._secrets_path, 'token.json')
-        self._creds = None
+# Max number of simultaneous connections to the Sheets API
+HTTP_POOL_SIZE = 4
+# Seconds before giving up on a single HTTP request
+HTTP_TIMEOUT = 30
+# Seconds before expiry the access token is refreshed. More than google-auth
+# waits, so requests never have to refresh it themselves
+TOKEN_REFRESH_AHEAD = 5*60
+# Seconds before trying again after a failed refresh
+TOKEN_REFRESH_RETRY = 30
+SCOPES = ['https://www.googleapis.com/auth/spreadsheets']
+
+
+def _write_atomically(path: str, text: str) -> None:
+    """Writes text to path, which is left either as it was or all new"""
+    # Same directory, so the rename does not cross file systems. mkstemp
+    # makes it readable by the user only
+    tmp_fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path) or '.',
+        prefix=f'.{os.path.basename(path)}.', suffix='.tmp')
+    try:
+        with os.fdopen(tmp_fd, 'w', encoding='utf-8') as tmp_file:
+            tmp_file.write(text)
+            tmp_file.flush()
+            os.fsync(tmp_file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class _SharedCredentials(Credentials):
+    """
+    Credentials refreshed by one thread at a time: requests refresh them
+    too, if the token expired anyway or was rejected. A thread which waited
+    for another one's refresh uses its token
+    """
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._refresh_lock = threading.Lock()
+
+    def refresh(self, request) -> None:
+        token = self.token
+        with self._refresh_lock:
+            if self.token != token and self.valid:
+                return
+            super().refresh(request)
+
+
+class _MeteredAuthorizedHttp(AuthorizedHttp):
+    """AuthorizedHttp which records the size of requests and responses"""
+    def request(self, uri, method='GET', body=None, headers=None, **kwargs):  # pylint: disable=missing-function-docstring
+        response, content = super().request(uri, method, body=body,
+                                            headers=headers, **kwargs)
+        METRICS.observe('sheets_request_bytes', len(body or b''),
+                        SIZE_BUCKETS)
+        METRICS.observe('sheets_response_bytes', len(content or b''),
+                        SIZE_BUCKETS)
+        return response, content
+
+
+class _AuthorizedHttpPool:
+    """
+    Thread-safe pool of authorized HTTP connections. httplib2.Http objects
+    keep their connections alive between requests, but are not thread-safe,
+    so each thread borrows one for the duration of a request.
+    """
+    def __init__(self, credentials, max_size: int = HTTP_POOL_SIZE) -> None:
+        self._credentials = credentials
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(max_size)
+
+    def _new_http(self) -> AuthorizedHttp:
+        return _MeteredAuthorizedHttp(
+            self._credentials,
+            http=httplib2.Http(timeout=HTTP_TIMEOUT)
+        )
+
+    @contextmanager
+    def connection(self):
+        """Borrows an idle connection, or opens one if none is available"""
+        with self._slots:
+            try:
+                http = self._idle.get_nowait()
+            except queue.Empty:
+                http = self._new_http()
+            try:
+                yield http
+            finally:
+                self._idle.put(http)
+
+
+class CredentialsManager:
+    """
+    OAuth credentials, from token.json in secrets_path or, the first time,
+    the browser login flow with its credentials.json. Once started, a daemon
+    thread refreshes the access token TOKEN_REFRESH_AHEAD seconds before it
+    expires, so no request waits for it, and saves it to token.json,
+    atomically. Use one per token.json, shared by every spreadsheet.
+    """
+    def __init__(self, secrets_path: str, scopes: list[str] = SCOPES) -> None:
+        self._token_path = os.path.join(secrets_path, 'token.json')
+        self._client_secrets_path = os.path.join(secrets_path,
+                                                 'credentials.json')
+        self._scopes = scopes
+        # Saves from the thread and from refresh() do not overlap
+        self._save_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.credentials = self._load()
+
+    def _load(self) -> _SharedCredentials:
+        creds = None
         # The file token.json stores the user's access and refresh tokens,
         # and is created automatically when the authorization flow completes
         # for the first time.
         if os.path.exists(self._token_path):
-            self._creds = Credentials.from_authorized_user_file(
+            creds = _SharedCredentials.from_authorized_user_file(
                 self._token_path,
                 self._scopes
             )
         # If there are no (valid) credentials available, let the user log in.
-        if not self._creds or not self._creds.valid:
-            if (self._creds
-                    and self._creds.expired
-                    and self._creds.refresh_token):
-                self._creds.refresh(Request())
+        if not creds or not creds.valid:
+            if (creds
+                    and creds.expired
+                    and creds.refresh_token):
+                creds.refresh(Request())
             else:
                 flow = InstalledAppFlow.from_client_secrets_file(
-                    self._creds_path,
+                    self._client_secrets_path,
                     self._scopes
                 )
-                self._creds = flow.run_local_server(port=0)
+                creds = _SharedCredentials.from_authorized_user_info(
+                    json.loads(flow.run_local_server(port=0).to_json()),
+                    self._scopes)
             # Save the credentials for the next run
-            with open(self._token_path, 'w', encoding='utf-8') as token:
-                token.write(self._creds.to_json())
+            _write_atomically(self._token_path, creds.to_json())
+        return creds
+
+    def refresh(self) -> bool:
+        """Refreshes the access token now, and saves it. False if it failed"""
+        with self._save_lock:
+            try:
+                self.credentials.refresh(Request())
+                _write_atomically(self._token_path,
+                                  self.credentials.to_json())
+            except (GoogleAuthError, OSError) as err:
+                METRICS.inc('sheets_token_refresh_errors_total')
+                print(err)
+                return False
+        return True
+
+    def seconds_to_refresh(self) -> float | None:
+        """Seconds until the token is refreshed, None if it never expires"""
+        if self.credentials.expiry is None:
+            return None
+        # google-auth expiries are naive UTC datetimes
+        now = datetime.now(timezone.utc).replace(tzinfo=None)
+        return max(0., (self.credentials.expiry - now).total_seconds()
+                   - TOKEN_REFRESH_AHEAD)
+
+    def _refresh_ahead(self) -> None:
+        delay = self.seconds_to_refresh()
+        while not self._stopped.wait(delay):
+            delay = (self.seconds_to_refresh() if self.refresh()
+                     else TOKEN_REFRESH_RETRY)
+
+    def start(self) -> None:
+        """Starts refreshing the token ahead of expiry, if it can be"""
+        if self._thread is None and self.credentials.refresh_token:
+            self._thread = threading.Thread(
+                target=self._refresh_ahead, name='token_refresh', daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        """Stops refreshing the token"""
+        self._stopped.set()
+
 
+class GoogleSpreadSheetInterface:
+    # pylint: disable=no-member
+    def __init__(self, *, credentials, spreadsheet_id) -> None:
+        """
+        credentials are google.auth credentials, e.g. those of a
+        CredentialsManager, which keeps them refreshed
+        """
+        self._spreadsheet_id = spreadsheet_id
+        # Guards the lazy, one-time construction of the API service
+        self._service_lock = threading.Lock()
+        self._values_api = None
+        self._creds = credentials
+        self._http_pool = _AuthorizedHttpPool(self._creds)
+
+    def _build_service(self):
+        # static_discovery uses the discovery document bundled with
+        # google-api-python-client, so no request is made to fetch it
+        return build('sheets', 'v4', credentials=self._creds,
+                     static_discovery=True, cache_discovery=False)
+
+    @property
+    def values_api(self):
+        """
+        spreadsheets.values resource of the Sheets API. It is built only once
+        and shared between calls, as building resources is expensive.
+        """
+        if self._values_api is None:
+            with self._service_lock:
+                if self._values_api is None:
+                    self._values_api = \
+                        self._build_service().spreadsheets().values()
+        return self._values_api
+
+    @METRICS.timed('sheets_read')
     def read_range(self, range_: str) -> list[list]:
         ret_value = None
         try:
-            with self._action_underway:
-                service = build('sheets', 'v4', credentials=self._creds)
-
-                # Call the Sheets API
-                # https://googleapis.github.io/google-api-python-client/docs/dyn/sheets_v4.spreadsheets.values.html#get
-                sheet = service.spreadsheets()
-                result = sheet.values().get(
-                    spreadsheetId=self._spreadsheet_id,
-                    range=range_,
-                    majorDimension='ROWS',
-                    valueRenderOption='UNFORMATTED_VALUE',
-                    dateTimeRenderOption='FORMATTED_STRING'
-                ).execute()
-                values = result.get('values', [])
+            # Call the Sheets API
+            # https://googleapis.github.io/google-api-python-client/docs/dyn/sheets_v4.spreadsheets.values.html#get
+            request = self.values_api.get(
+                spreadsheetId=self._spreadsheet_id,
+                range=range_,
+                majorDimension='ROWS',
+                valueRenderOption='UNFORMATTED_VALUE',
+                dateTimeRenderOption='FORMATTED_STRING'
+            )
+            with self._http_pool.connection() as http:
+                result = request.execute(http=http)
+            values = result.get('values', [])
 
             if not values:
                 print('No data found.')
             ret_value = values
         except HttpError as err:
+            METRICS.inc('sheets_errors_total')
+            print(err)
+        return ret_value
+
+    @METRICS.timed('sheets_batch_read')
+    def read_ranges(self, ranges: list[str]) -> list[list[list]]:
+        """
+        Reads several ranges in a single request. Returns the values of each
+        range, in the same order
+        """
+        ret_value = None
+        try:
+            # Call the Sheets API
+            # https://googleapis.github.io/google-api-python-client/docs/dyn/sheets_v4.spreadsheets.values.html#batchGet
+            request = self.values_api.batchGet(
+                spreadsheetId=self._spreadsheet_id,
+                ranges=ranges,
+                majorDimension='ROWS',
+                valueRenderOption='UNFORMATTED_VALUE',
+                dateTimeRenderOption='FORMATTED_STRING'
+            )
+            with self._http_pool.connection() as http:
+                result = request.execute(http=http)
+            ret_value = [value_range.get('values', [])
+                         for value_range in result.get('valueRanges', [])]
+        except HttpError as err:
+            METRICS.inc('sheets_errors_total')
             print(err)
         return ret_value
 
+    @METRICS.timed('sheets_write')
     def update_range(self, range_: str, values: list[list]) -> dict | None:
         ret_value = None
         try:
-            with self._action_underway:
-                service = build('sheets', 'v4', credentials=self._creds)
-
-                # Call the Sheets API
-                # https://googleapis.github.io/google-api-python-client/docs/dyn/sheets_v4.spreadsheets.values.html#update
-                sheet = service.spreadsheets()
-                ret_value = sheet.values().update(
-                    spreadsheetId=self._spreadsheet_id,
-                    range=range_,
-                    valueInputOption='USER_ENTERED',
-                    body={
+            # Call the Sheets API
+            # https://googleapis.github.io/google-api-python-client/docs/dyn/sheets_v4.spreadsheets.values.html#update
+            request = self.values_api.update(
+                spreadsheetId=self._spreadsheet_id,
+                range=range_,
+                valueInputOption='USER_ENTERED',
+                body={
+                    'values': values,
+                    'majorDimension': 'ROWS'
+                }
+            )
+            with self._http_pool.connection() as http:
+                ret_value = request.execute(http=http)
+        except HttpError as err:
+            METRICS.inc('sheets_errors_total')
+            print(err)
+        return ret_value
+
+    @METRICS.timed('sheets_batch_write')
+    def batch_update_ranges(self, data: dict[str, list[list]],
+                            include_values: bool = False) -> dict | None:
+        """
+        Updates several ranges in a single request. data maps each A1 range
+        to its values. With include_values, the response has the values of
+        each range after the update, as read_ranges would return them, in
+        responses[i]['updatedData']['values']
+        """
+        ret_value = None
+        try:
+            # Call the Sheets API
+            # https://googleapis.github.io/google-api-python-client/docs/dyn/sheets_v4.spreadsheets.values.html#batchUpdate
+            body = {
+                'valueInputOption': 'USER_ENTERED',
+                'data': [
+                    {
+                        'range': range_,
                         'values': values,
                         'majorDimension': 'ROWS'
                     }
-                ).execute()
+                    for range_, values in data.items()
+                ]
+            }
+            if include_values:
+                body['includeValuesInResponse'] = True
+                body['responseValueRenderOption'] = 'UNFORMATTED_VALUE'
+                body['responseDateTimeRenderOption'] = 'FORMATTED_STRING'
+            request = self.values_api.batchUpdate(
+                spreadsheetId=self._spreadsheet_id,
+                body=body
+            )
+            with self._http_pool.connection() as http:
+                ret_value = request.execute(http=http)
         except HttpError as err:
+            METRICS.inc('sheets_errors_total')
             print(err)
         return ret_value
@@ -0,0 +1,97 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module refreshes the orders incrementally: only the orders that
+changed since the last refresh are read from the order store"""
+
+import time
+
+import pandas as pd
+
+from order_store import OrderStore
+from orders_parsing import apply_dtypes
+
+# Seconds between full reads, which find edits to the columns not in
+# constants.FINGERPRINT_RANGES, e.g. a form answer corrected by hand
+FULL_READ_INTERVAL = 60*60
+
+
+class IncrementalOrderSync:
+    """
+    Keeps the orders DataFrame from the last refresh, and the revision of the
+    order store it corresponds to, patched with the orders that changed.
+    Every full_read_interval, all the orders are read again.
+    Not thread-safe: use it from one thread only.
+    """
+    def __init__(self, order_store: OrderStore,
+                 full_read_interval: float = FULL_READ_INTERVAL) -> None:
+        self._order_store = order_store
+        self._full_read_interval = full_read_interval
+        self._revision = None
+        self._orders_df = None
+        self._seed_revision = None
+        self._full_read_at = None
+
+    def begin_seed(self) -> bool:
+        """
+        Called before reading the orders given to seed: takes the revision of
+        the order store, so orders changed meanwhile are read again next
+        fetch. False if it could not be had, so fetch is needed instead
+        """
+        self._seed_revision = self._order_store.revision()
+        return self._seed_revision is not None
+
+    def seed(self, orders_df: pd.DataFrame) -> None:
+        """Takes all the orders, read otherwise, e.g. in chunks"""
+        self._orders_df = orders_df.copy()
+        self._revision = self._seed_revision
+        self._full_read_at = time.monotonic()
+
+    def fetch(self) -> pd.DataFrame | None:
+        """
+        Refreshes the orders, reading only new or changed ones. Returns a
+        copy of the orders DataFrame, or None if the refresh failed
+        """
+        full_read = (self._revision is None
+                     or time.monotonic() - self._full_read_at
+                     >= self._full_read_interval)
+        changes = self._order_store.changed_since(
+            None if full_read else self._revision)
+        if changes is None:
+            return None
+        if full_read:
+            self._full_read_at = time.monotonic()
+        if self._orders_df is None or full_read or changes.full:
+            orders_df = changes.orders
+        else:
+            # Drop orders that changed or no longer exist, then put the
+            # changed ones back
+            stale = self._orders_df.index.intersection(
+                changes.orders.index.union(changes.removed))
+            orders_df = (self._orders_df.drop(index=stale) if len(stale)
+                         else self._orders_df)
+            if not changes.orders.empty:
+                orders_df = apply_dtypes(
+                    pd.concat([orders_df, changes.orders]).sort_index())
+        self._orders_df = orders_df
+        self._revision = changes.revision
+        return orders_df.copy()
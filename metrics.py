@@ -0,0 +1,148 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module records counters and latency and size histograms of
+each stage of the app, so slowness can be attributed to the network, parsing
+or the UI. Observations can be logged, and exported in Prometheus text
+format"""
+
+import functools
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from logging.handlers import RotatingFileHandler
+
+# Histogram upper bounds, the last bucket is +Inf
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1., 2.5, 5., 10.)
+SIZE_BUCKETS = (1e3, 1e4, 1e5, 1e6, 1e7)
+
+_logger = logging.getLogger('reproui.metrics')
+
+
+class _Histogram:
+    """Cumulative histogram, as Prometheus defines it"""
+    def __init__(self, buckets: tuple) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.
+        self.count = 0
+        self.last = None
+
+    def observe(self, value: float) -> None:  # pylint: disable=missing-function-docstring
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.last = value
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms"""
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name: str, amount: int = 1) -> None:
+        """Increments a counter"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + amount
+
+    def observe(self, name: str, value: float,
+                buckets: tuple = LATENCY_BUCKETS) -> None:
+        """Records a value in a histogram, seconds by default"""
+        with self._lock:
+            if name not in self._histograms:
+                self._histograms[name] = _Histogram(buckets)
+            self._histograms[name].observe(value)
+        _logger.info('%s %g', name, value)
+
+    @contextmanager
+    def timer(self, name: str):
+        """Records how long the block takes in the '<name>_seconds'
+        histogram, and counts failures in '<name>_errors_total'"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            self.inc(f'{name}_errors_total')
+            raise
+        finally:
+            self.observe(f'{name}_seconds', time.perf_counter() - start)
+
+    def timed(self, name: str):
+        """Decorator version of timer"""
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def last(self, name: str) -> float | None:
+        """Last value observed by a histogram, None if there is none"""
+        with self._lock:
+            histogram = self._histograms.get(name)
+            return None if histogram is None else histogram.last
+
+    def to_prometheus(self) -> str:
+        """All metrics in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for name, value in sorted(self._counters.items()):
+                lines += [f'# TYPE reproui_{name} counter',
+                          f'reproui_{name} {value}']
+            for name, histogram in sorted(self._histograms.items()):
+                lines.append(f'# TYPE reproui_{name} histogram')
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',),
+                                        histogram.counts):
+                    cumulative += count
+                    lines.append(
+                        f'reproui_{name}_bucket{{le="{bound}"}} {cumulative}')
+                lines += [f'reproui_{name}_sum {histogram.sum}',
+                          f'reproui_{name}_count {histogram.count}']
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str) -> None:
+        """Writes to_prometheus() to a file, atomically"""
+        tmp_path = f'{path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as metrics_file:
+            metrics_file.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+
+def log_to_file(path: str, max_bytes: int = 1_000_000,
+                backup_count: int = 3) -> None:
+    """Logs every observation to a rotating file"""
+    handler = RotatingFileHandler(path, maxBytes=max_bytes,
+                                  backupCount=backup_count, encoding='utf-8')
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    _logger.addHandler(handler)
+    _logger.setLevel(logging.INFO)
+
+
+# Registry shared by the whole app
+METRICS = Metrics()
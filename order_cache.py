@@ -0,0 +1,105 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module stores the last fetched orders locally, so they can be
+shown at launch before (or without) reaching the spreadsheet"""
+
+import json
+import os
+import sqlite3
+from contextlib import closing
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import constants
+
+# Bump when the way orders are stored changes
+CACHE_FORMAT_VERSION = 3
+
+
+def _schema_version() -> str:
+    """Cached orders are only valid for the same format and columns"""
+    return json.dumps([CACHE_FORMAT_VERSION, constants.COLUMN_NAMES])
+
+
+class OrderCache:
+    """
+    SQLite file with the orders DataFrame (one typed column per order column)
+    and its metadata: schema version, dtypes and the time it was saved.
+    A connection is opened per call, so it can be used from any thread.
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+
+    def save(self, orders_df: pd.DataFrame) -> None:
+        """Replaces the cached orders with orders_df"""
+        meta = {
+            'schema': _schema_version(),
+            'saved_at': datetime.now(timezone.utc).isoformat(),
+            'dtypes': json.dumps(
+                {col: str(dtype) for col, dtype in orders_df.dtypes.items()}),
+        }
+        try:
+            with closing(sqlite3.connect(self._path)) as con, con:
+                con.execute('CREATE TABLE IF NOT EXISTS meta '
+                            '(key TEXT PRIMARY KEY, value TEXT)')
+                # Object columns mix types, BLOB affinity stores them as is.
+                # Categories too, or pandas would store them as text
+                blob_cols = [col for col, dtype in orders_df.dtypes.items()
+                             if dtype == object or dtype == 'category']
+                orders_df.astype({col: object for col in blob_cols}).to_sql(
+                    'orders', con, if_exists='replace', index=True,
+                    index_label='ROW_ID',
+                    dtype={col: 'BLOB' for col in blob_cols})
+                con.executemany('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                                meta.items())
+        except sqlite3.Error as err:
+            print('Error caching orders.')
+            print(err)
+
+    def load(self) -> tuple[pd.DataFrame, datetime] | None:
+        """
+        Returns the cached orders and when they were saved, or None if there
+        is no valid cache
+        """
+        if not os.path.isfile(self._path):
+            return None
+        try:
+            with closing(sqlite3.connect(self._path)) as con:
+                meta = dict(con.execute('SELECT key, value FROM meta'))
+                if meta.get('schema') != _schema_version():
+                    return None
+                orders_df = pd.read_sql('SELECT * FROM orders', con,
+                                        index_col='ROW_ID')
+        except (sqlite3.Error, pd.errors.DatabaseError) as err:
+            print('Error reading cached orders, ignoring them.')
+            print(err)
+            return None
+        orders_df.index.name = None
+        # SQLite has no booleans nor datetimes, restore original dtypes
+        for col, dtype in json.loads(meta['dtypes']).items():
+            if dtype.startswith('datetime64'):
+                orders_df[col] = pd.to_datetime(orders_df[col])
+            elif dtype != 'object':
+                orders_df[col] = orders_df[col].astype(dtype)
+        return orders_df, datetime.fromisoformat(meta['saved_at'])
@@ -0,0 +1,208 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module indexes the shown orders to search and filter them as
+the user types: an inverted index of the words in their texts, and a bitmap
+per value of each facet"""
+
+import re
+import unicodedata
+from bisect import bisect_left, insort
+
+import numpy as np
+
+from order_table import OrderTable, OrderRow
+
+# Columns searched by free text
+TEXT_COLUMNS = ['NAME', 'COMMENT', 'REF']
+# Columns that can be filtered by value. SOURCE is only there with several
+# sources, see order_store.MultiOrderStore
+FACET_COLUMNS = ['SOURCE', 'PRINTER', 'COLOUR_MATERIAL', 'LOOKUP_MEMBER',
+                 'APPROVED', 'PRINTED', 'PICKED_UP', 'PAID']
+
+_WORD_RE = re.compile(r'\w+')
+
+
+def _normalize(text: str) -> str:
+    """Lowercase and without accents, so 'lucia' finds 'Lucía'"""
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in decomposed
+                   if not unicodedata.combining(char))
+
+
+def words(text: str) -> list[str]:
+    """Normalized words of text, as they are indexed and searched"""
+    return _WORD_RE.findall(_normalize(text))
+
+
+def _facet_groups(values: np.ndarray) -> dict:
+    """{value: mask of values equal to it}, missing values as None"""
+    if values.dtype == bool:
+        return {True: values, False: ~values}
+    # OrderTable object columns have None for missing values
+    missing = np.equal(values, None)
+    groups = {None: missing}
+    for value in set(values[~missing].tolist()):
+        groups[value] = values == value
+    return groups
+
+
+def _order_words(order: OrderRow) -> set[str]:
+    """Words an order is found by"""
+    texts = [str(order[col]) for col in TEXT_COLUMNS if col != 'REF']
+    ref = order['REF']
+    if ref is not None:
+        # As typed, and as shown
+        texts.append(f'{ref} {ref:0>4}')
+    order_words = set()
+    for text in texts:
+        order_words.update(words(text))
+    return order_words
+
+
+class OrderIndex:
+    """
+    Search index over the orders of an OrderTable. Each order gets a slot,
+    kept across updates, so a refresh only reindexes the orders added,
+    removed or changed. Words map to the set of slots containing them, and
+    facet values to a boolean array over slots.
+    """
+    def __init__(self) -> None:
+        self._slot_of = {}  # row_id -> slot
+        self._row_of = np.zeros(0, dtype=np.int64)  # slot -> row_id
+        self._alive = np.zeros(0, dtype=bool)
+        self._free_slots = []
+        self._postings = {}  # word -> set of slots
+        self._words = []  # Sorted, for prefix searches
+        self._slot_words = {}  # slot -> words, to unindex it
+        self._facets = {col: {} for col in FACET_COLUMNS}
+
+    def _grow(self) -> None:
+        """Doubles the number of slots"""
+        old_capacity = len(self._alive)
+        capacity = max(64, 2*old_capacity)
+        extra = capacity - old_capacity
+        self._row_of = np.concatenate(
+            [self._row_of, np.zeros(extra, dtype=np.int64)])
+        self._alive = np.concatenate([self._alive, np.zeros(extra, bool)])
+        for bitmaps in self._facets.values():
+            for value, bitmap in bitmaps.items():
+                bitmaps[value] = np.concatenate(
+                    [bitmap, np.zeros(extra, bool)])
+        # Popped from the end, lowest first
+        self._free_slots = (list(range(capacity - 1, old_capacity - 1, -1))
+                            + self._free_slots)
+
+    def _add(self, orders: OrderTable, row_ids: list[int]) -> None:
+        while len(self._free_slots) < len(row_ids):
+            self._grow()
+        slots = np.array([self._free_slots.pop() for _ in row_ids],
+                         dtype=np.intp)
+        self._slot_of.update(zip(row_ids, slots.tolist()))
+        self._row_of[slots] = row_ids
+        self._alive[slots] = True
+
+        for row_id, slot in zip(row_ids, slots.tolist()):
+            slot_words = _order_words(orders.row(row_id))
+            self._slot_words[slot] = slot_words
+            for word in slot_words:
+                if word not in self._postings:
+                    self._postings[word] = set()
+                    insort(self._words, word)
+                self._postings[word].add(slot)
+
+        # Facets a whole column at a time
+        positions = np.array([orders.position(row_id) for row_id in row_ids],
+                             dtype=np.intp)
+        for col, bitmaps in self._facets.items():
+            if col not in orders.columns:
+                continue
+            groups = _facet_groups(orders.columns[col][positions])
+            for value, mask in groups.items():
+                if value not in bitmaps:
+                    bitmaps[value] = np.zeros(len(self._alive), dtype=bool)
+                bitmaps[value][slots[mask]] = True
+
+    def _remove(self, row_id: int) -> None:
+        slot = self._slot_of.pop(row_id)
+        self._alive[slot] = False
+        for word in self._slot_words.pop(slot):
+            # Words left without orders are kept, they are few
+            self._postings[word].discard(slot)
+        for bitmaps in self._facets.values():
+            for bitmap in bitmaps.values():
+                bitmap[slot] = False
+        self._free_slots.append(slot)
+
+    def update(self, orders: OrderTable, changed_ids=()) -> None:
+        """
+        Reindexes orders added or removed since last update, and those in
+        changed_ids
+        """
+        new_ids = set(orders.row_ids)
+        for row_id in set(self._slot_of).difference(new_ids):
+            self._remove(row_id)
+        for row_id in changed_ids:
+            if row_id in self._slot_of:
+                self._remove(row_id)
+        self._add(orders, list(new_ids.difference(self._slot_of)))
+
+    def update_orders(self, orders: OrderTable, row_ids: list[int]) -> None:
+        """Reindexes some orders, e.g. after they were changed in place"""
+        for row_id in row_ids:
+            if row_id in self._slot_of:
+                self._remove(row_id)
+        self._add(orders, list(row_ids))
+
+    def facet_values(self, col: str) -> list:
+        """Values of col found in some order, missing (None) excluded"""
+        return sorted(value for value, bitmap in self._facets[col].items()
+                      if value is not None and bitmap.any())
+
+    def _word_mask(self, prefix: str) -> np.ndarray:
+        """Slots with a word starting with prefix"""
+        slots = set()
+        for pos in range(bisect_left(self._words, prefix), len(self._words)):
+            word = self._words[pos]
+            if not word.startswith(prefix):
+                break
+            slots.update(self._postings[word])
+        mask = np.zeros(len(self._alive), dtype=bool)
+        mask[list(slots)] = True
+        return mask
+
+    def search(self, text: str = '', facets: dict | None = None) -> set:
+        """
+        Row ids of the orders with words starting with every word of text,
+        and the value given for each column in facets
+        """
+        mask = self._alive.copy()
+        for prefix in words(text):
+            mask &= self._word_mask(prefix)
+        for col, value in (facets or {}).items():
+            bitmap = self._facets[col].get(value)
+            if bitmap is None:
+                return set()
+            mask &= bitmap
+        return set(self._row_of[mask].tolist())
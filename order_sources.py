@@ -0,0 +1,120 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module reads the configuration file and builds the order store
+it describes. It is shared by the app and the sync daemon, so it must not
+import Qt"""
+
+import os
+
+import tomli
+
+from startup_profile import STARTUP
+from order_store import (OrderStore, GoogleSheetsOrderStore, SqliteOrderStore,
+                         MultiOrderStore)
+
+SECRETS_PATH = os.path.join('.', 'secrets')
+CONFIG_FILE = os.path.join(SECRETS_PATH, 'config.toml')
+SHEET_NAME = 'HojaA'
+
+# google_flow.CredentialsManager of SECRETS_PATH, shared by every
+# spreadsheet. Created with the first one
+_credentials = None
+
+
+def load_config(path: str = CONFIG_FILE) -> dict:
+    """Contents of the configuration file, IOError if there is none"""
+    if not os.path.isfile(path):
+        raise IOError('Configuration file not found')
+    with open(path, 'rb') as cf_file:
+        return tomli.load(cf_file)
+
+
+def create_order_store(config: dict, *,
+                       via_daemon: bool = True) -> OrderStore:
+    """
+    Order store of config: the sync daemon at DAEMON_ADDRESS (unless
+    via_daemon is False, e.g. for the daemon itself), several SOURCES, an
+    SQLite file or, by default, a Google spreadsheet
+    """
+    if via_daemon and config.get('DAEMON_ADDRESS'):
+        # Thin client: the daemon has the credentials and the quota
+        # Imported here, the daemon imports this module
+        from sync_daemon import RemoteOrderStore  # pylint: disable=import-outside-toplevel
+        return RemoteOrderStore(config['DAEMON_ADDRESS'])
+    if config.get('SOURCES'):
+        return _create_multi_order_store(config['SOURCES'])
+    if config.get('ORDER_STORE', 'sheets') == 'sqlite':
+        return SqliteOrderStore(config['ORDER_STORE_PATH'])
+    return GoogleSheetsOrderStore(
+        _create_ss_interface(config['SPREADSHEET_ID']), SHEET_NAME)
+
+
+def _create_multi_order_store(sources: list[dict]) -> OrderStore:
+    """
+    Sources are {NAME, SPREADSHEET_ID, SHEET} or {NAME, PATH} of an
+    SQLite order store. Sheets of the same spreadsheet are read together.
+    ValueError if two sources have the same NAME
+    """
+    names = [source['NAME'] for source in sources]
+    repeated = sorted({name for name in names if names.count(name) > 1})
+    if repeated:
+        raise ValueError(f'SOURCES in {CONFIG_FILE} must have different '
+                         f'NAMEs, repeated: {", ".join(repeated)}')
+    sheets_by_id = {}
+    stores = []
+    for source in sources:
+        if 'PATH' in source:
+            stores.append(
+                (SqliteOrderStore(source['PATH']), [source['NAME']]))
+        else:
+            sheets_by_id.setdefault(source['SPREADSHEET_ID'], []).append(
+                (source.get('SHEET', SHEET_NAME), source['NAME']))
+    for spreadsheet_id, sheets in sheets_by_id.items():
+        stores.append((
+            GoogleSheetsOrderStore(
+                _create_ss_interface(spreadsheet_id),
+                *[sheet_name for sheet_name, _ in sheets]),
+            [name for _, name in sheets]))
+    return MultiOrderStore(stores)
+
+
+def _create_ss_interface(spreadsheet_id: str):
+    global _credentials  # pylint: disable=global-statement
+    # Imported here, it takes as long as the rest of the app to import
+    with STARTUP.phase('import Google client'):
+        from google_flow import (  # pylint: disable=import-outside-toplevel
+            CredentialsManager, GoogleSpreadSheetInterface)
+    with STARTUP.phase('credentials'):
+        if _credentials is None:
+            # May need the user to log in, call it away from the GUI thread
+            _credentials = CredentialsManager(SECRETS_PATH)
+            _credentials.start()
+        return GoogleSpreadSheetInterface(
+            credentials=_credentials.credentials,
+            spreadsheet_id=spreadsheet_id)
+
+
+def stop_credentials() -> None:
+    """Stops refreshing the Google credentials, if they were loaded"""
+    if _credentials is not None:
+        _credentials.stop()
@@ -0,0 +1,728 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module defines where orders are read from and written to: the
+OrderStore interface, and its Google Spreadsheet and SQLite backends"""
+
+import sqlite3
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from contextlib import closing
+from typing import Callable, Iterator, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+import constants
+from orders_parsing import apply_dtypes, parse_cell, parse_orders
+
+# Orders of several sources (sheets, spreadsheets...) have ROW_ID
+# source*SOURCE_ROW_STRIDE + row. Sheets are far smaller than this
+SOURCE_ROW_STRIDE = 1_000_000
+# Requests for chunks of orders made at once, see
+# GoogleSheetsOrderStore.read_chunks. Not more than google_flow.HTTP_POOL_SIZE
+CHUNKS_IN_FLIGHT = 4
+
+
+class OrderChanges(NamedTuple):
+    """Orders added or changed since a revision, and the ROW_IDs removed"""
+    orders: pd.DataFrame
+    removed: list[int]
+    # Opaque, to be given to the next OrderStore.changed_since call
+    revision: object
+    # orders are all the orders, not changes: the revision given was unknown
+    full: bool = False
+
+
+class Watermark(NamedTuple):
+    """
+    Rows that may hold pending orders, as ROW_IDs: of each source
+    (ROW_ID // SOURCE_ROW_STRIDE), every row from its start on, and the
+    older ones in rows. Sources without a start are read whole
+    """
+    starts: list[int]
+    rows: list[int]
+
+
+class OrderStore(ABC):
+    """
+    Where orders are read from and written to. Orders are DataFrames indexed
+    by ROW_ID, with the columns and dtypes in constants.COLUMN_DTYPES.
+    Methods are called from the background thread, and return None or False
+    if the store could not be reached.
+    """
+    @abstractmethod
+    def read(self) -> pd.DataFrame | None:
+        """All the orders"""
+
+    @abstractmethod
+    def changed_since(self, revision=None) -> OrderChanges | None:
+        """
+        Orders changed since revision, as returned by the last call. With no
+        revision, all the orders
+        """
+
+    def read_pending(self, watermark: Watermark) -> pd.DataFrame | None:
+        """
+        Orders in the rows of watermark, which may be pending, and maybe
+        others. By default, all the orders
+        """
+        return self.read()
+
+    def revision(self) -> object | None:
+        """
+        Revision changed_since would return now, without reading the orders,
+        for orders read otherwise (e.g. with read_chunks) right after. None
+        if it could not be had, or not without reading them all
+        """
+        return None
+
+    @abstractmethod
+    def write_cells(self, cells: dict[tuple[int, str], object]) -> bool:
+        """Writes {(ROW_ID, column name): value}, all of them or none"""
+
+    def commit_cells(self, cells: dict[tuple[int, str], object]
+                     ) -> dict[tuple[int, str], object] | None:
+        """
+        Writes cells like write_cells, and returns them as stored after the
+        write, so they need not be read again. None if not written. By
+        default, as they were given
+        """
+        return dict(cells) if self.write_cells(cells) else None
+
+    def read_chunks(self, chunk_size: int, newest_first: bool = False,
+                    throttle: Callable[[], None] | None = None
+                    ) -> Iterator[pd.DataFrame | None]:
+        """
+        All the orders, by ROW_ID, in frames of up to about chunk_size rows,
+        so any number of orders can be gone through in flat memory. Or, if
+        newest_first, descending, in frames of chunk_size rows and then
+        twice as many each time, so the newest are shown before all of them
+        arrive, in few requests. Yields None and stops if a chunk could not
+        be read. Stores reading through a rate limited API call throttle, if
+        given, before each request; it may block. By default, all the orders
+        in a single frame
+        """
+        yield self.read()
+
+
+def _unthrottled() -> None:
+    """Throttle of reads not rate limited"""
+
+
+def _runs(rows: list[int]) -> list[tuple[int, int]]:
+    """
+    Groups sorted row indexes into contiguous [start, stop) runs, so each run
+    can be requested as a single range
+    """
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row:
+            runs[-1][1] = row + 1
+        else:
+            runs.append([row, row + 1])
+    return [(start, stop) for start, stop in runs]
+
+
+def _in_order(executor: ThreadPoolExecutor, func, args_list: list,
+              in_flight: int) -> Iterator:
+    """
+    func(*args) for each args, in the order given, with up to in_flight of
+    them running at once
+    """
+    futures = deque()
+    for args in args_list:
+        futures.append(executor.submit(func, *args))
+        if len(futures) >= in_flight:
+            yield futures.popleft().result()
+    while futures:
+        yield futures.popleft().result()
+
+
+class GoogleSheetsOrderStore(OrderStore):
+    """
+    Orders in one or more sheets (tabs) of a Google spreadsheet, one per row
+    after the column names row. Each operation takes a single request for all
+    the sheets. Orders of the n-th sheet have ROW_ID n*SOURCE_ROW_STRIDE+row.
+    Revisions are the fingerprints of every row: a cheap projection of the
+    sheets is fetched first, and only the rows whose fingerprint changed are
+    downloaded again.
+    """
+    def __init__(self, ssheet_inter, *sheet_names: str) -> None:
+        """ssheet_inter is a GoogleSpreadSheetInterface, or alike"""
+        self._ssheet_inter = ssheet_inter
+        self._sheet_names = sheet_names
+
+    @staticmethod
+    def _range(sheet_name: str, col1: str, col2: str, start: int = 0,
+               stop: int | None = None) -> str:
+        # DF index 0 is the second row of the sheet
+        return (f'{sheet_name}!'
+                f'{constants.A1_TO_COLUMN[col1]}{start + 2}:'
+                f'{constants.A1_TO_COLUMN[col2]}'
+                f'{stop + 1 if stop is not None else ""}')
+
+    def _fetch_fingerprints(self) -> list[list[int]] | None:
+        """Fingerprints of the rows of each sheet"""
+        n_ranges = len(constants.FINGERPRINT_RANGES)
+        projections = self._ssheet_inter.read_ranges([
+            self._range(sheet_name, col1, col2)
+            for sheet_name in self._sheet_names
+            for col1, col2 in constants.FINGERPRINT_RANGES])
+        if projections is None:
+            return None
+        fingerprints = []
+        for first in range(0, len(projections), n_ranges):
+            projection = projections[first:first + n_ranges]
+            n_rows = len(projection[0])
+            # Trailing empty rows are not returned, pad every column range
+            fingerprints.append([
+                hash(tuple(tuple(values[row]) if row < len(values) else ()
+                           for values in projection))
+                for row in range(n_rows)
+            ])
+        return fingerprints
+
+    def read(self) -> pd.DataFrame | None:
+        sheets_raw = self._ssheet_inter.read_ranges([
+            self._range(sheet_name, 'TEMP', 'REPRO_COMMENTS')
+            for sheet_name in self._sheet_names])
+        if sheets_raw is None:
+            return None
+        orders = [parse_orders(raw, sheet*SOURCE_ROW_STRIDE)
+                  for sheet, raw in enumerate(sheets_raw)]
+        if any(orders_df is None for orders_df in orders):
+            return None
+        return orders[0] if len(orders) == 1 else apply_dtypes(
+            pd.concat(orders))
+
+    def read_chunks(self, chunk_size: int, newest_first: bool = False,
+                    throttle: Callable[[], None] | None = None
+                    ) -> Iterator[pd.DataFrame | None]:
+        throttle = throttle or _unthrottled
+        if newest_first:
+            yield from self._read_chunks_newest_first(chunk_size, throttle)
+            return
+        # A request per chunk, until one comes back empty
+        for sheet, sheet_name in enumerate(self._sheet_names):
+            start = 0
+            while True:
+                throttle()
+                rows_raw = self._ssheet_inter.read_ranges([self._range(
+                    sheet_name, 'TEMP', 'REPRO_COMMENTS',
+                    start, start + chunk_size)])
+                if rows_raw is None:
+                    yield None
+                    return
+                if not rows_raw[0]:
+                    break
+                orders_df = parse_orders(rows_raw[0],
+                                         sheet*SOURCE_ROW_STRIDE + start)
+                yield orders_df
+                if orders_df is None:
+                    return
+                start += chunk_size
+
+    def _read_chunks_newest_first(self, chunk_size: int,
+                                  throttle: Callable[[], None]
+                                  ) -> Iterator[pd.DataFrame | None]:
+        """
+        Rows are counted first, with the smallest column, so windows can be
+        read from the last one, each twice the size of the one before. Up to
+        CHUNKS_IN_FLIGHT requests at once
+        """
+        throttle()
+        temps = self._ssheet_inter.read_ranges([
+            self._range(sheet_name, 'TEMP', 'TEMP')
+            for sheet_name in self._sheet_names])
+        if temps is None:
+            yield None
+            return
+        windows = []
+        for sheet, temp in reversed(list(enumerate(temps))):
+            stop = len(temp)
+            size = chunk_size
+            while stop > 0:
+                windows.append((sheet, max(0, stop - size), stop))
+                stop -= size
+                size *= 2
+
+        def read_window(sheet: int, start: int, stop: int):
+            throttle()
+            rows_raw = self._ssheet_inter.read_ranges([self._range(
+                self._sheet_names[sheet], 'TEMP', 'REPRO_COMMENTS',
+                start, stop)])
+            if rows_raw is None:
+                return None
+            orders_df = parse_orders(rows_raw[0],
+                                     sheet*SOURCE_ROW_STRIDE + start)
+            return None if orders_df is None else orders_df.iloc[::-1]
+
+        with ThreadPoolExecutor(max_workers=CHUNKS_IN_FLIGHT,
+                                thread_name_prefix='order_chunks') as executor:
+            for orders_df in _in_order(executor, read_window, windows,
+                                       CHUNKS_IN_FLIGHT):
+                yield orders_df
+                if orders_df is None:
+                    return
+
+    def read_pending(self, watermark: Watermark) -> pd.DataFrame | None:
+        # A single request, with a range from the start of each sheet on,
+        # and one per run of older rows
+        starts = dict(divmod(start, SOURCE_ROW_STRIDE)
+                      for start in watermark.starts)
+        older = {}
+        for row_id in watermark.rows:
+            sheet, row = divmod(row_id, SOURCE_ROW_STRIDE)
+            if row < starts.get(sheet, 0):
+                older.setdefault(sheet, []).append(row)
+        windows = []
+        for sheet in range(len(self._sheet_names)):
+            windows.extend((sheet, start, stop) for start, stop
+                           in _runs(sorted(older.get(sheet, []))))
+            windows.append((sheet, starts.get(sheet, 0), None))
+        rows_raw = self._ssheet_inter.read_ranges([
+            self._range(self._sheet_names[sheet], 'TEMP', 'REPRO_COMMENTS',
+                        start, stop)
+            for sheet, start, stop in windows])
+        if rows_raw is None:
+            return None
+        # Parsed at once, there may be many small ranges
+        row_ids = np.concatenate([
+            np.arange(len(raw)) + sheet*SOURCE_ROW_STRIDE + start
+            for raw, (sheet, start, _) in zip(rows_raw, windows)])
+        orders_df = parse_orders([row for raw in rows_raw for row in raw])
+        if orders_df is None:
+            return None
+        return orders_df.set_axis(
+            pd.Index(row_ids[orders_df.index.to_numpy()]), axis=0)
+
+    def revision(self) -> list[list[int]] | None:
+        return self._fetch_fingerprints()
+
+    def changed_since(self, revision=None) -> OrderChanges | None:
+        all_old = revision or [[] for _ in self._sheet_names]
+        all_new = self._fetch_fingerprints()
+        if all_new is None:
+            return None
+        # [(sheet, start, stop)] of the rows to download again
+        runs = []
+        removed = []
+        for sheet, (old, new) in enumerate(zip(all_old, all_new)):
+            changed = [row for row, fingerprint in enumerate(new)
+                       if row >= len(old) or fingerprint != old[row]]
+            runs.extend((sheet, start, stop) for start, stop in _runs(changed))
+            # Rows past the end
+            removed.extend(sheet*SOURCE_ROW_STRIDE + row
+                           for row in range(len(new), len(old)))
+        if runs:
+            rows_raw = self._ssheet_inter.read_ranges([
+                self._range(self._sheet_names[sheet], 'TEMP',
+                            'REPRO_COMMENTS', start, stop)
+                for sheet, start, stop in runs])
+            if rows_raw is None:
+                return None
+            patches = [parse_orders(raw, sheet*SOURCE_ROW_STRIDE + start)
+                       for raw, (sheet, start, _) in zip(rows_raw, runs)]
+            if any(patch is None for patch in patches):
+                return None
+            orders_df = apply_dtypes(pd.concat(patches))
+        else:
+            orders_df = parse_orders([])
+        # Changed rows no longer holding an order
+        removed.extend(sorted(
+            {sheet*SOURCE_ROW_STRIDE + row
+             for sheet, start, stop in runs for row in range(start, stop)}
+            .difference(orders_df.index)))
+        return OrderChanges(orders_df, removed, all_new)
+
+    def _write_data(self, cells: dict[tuple[int, str], object]
+                    ) -> tuple[dict, list[tuple[int, str, int, int]]]:
+        """
+        {A1 range: values} to write cells, and the (sheet, col, start, stop)
+        of each range. Cells of consecutive rows of a column go in a single
+        range
+        """
+        by_column = {}
+        for (row_id, col), value in cells.items():
+            sheet, row = divmod(row_id, SOURCE_ROW_STRIDE)
+            by_column.setdefault((sheet, col), {})[row] = value
+        data = {}
+        ranges = []
+        for (sheet, col), values in by_column.items():
+            for start, stop in _runs(sorted(values)):
+                data[self._range(self._sheet_names[sheet], col, col,
+                                 start, stop)] = [
+                    [str(values[row])] for row in range(start, stop)]
+                ranges.append((sheet, col, start, stop))
+        return data, ranges
+
+    def write_cells(self, cells: dict[tuple[int, str], object]) -> bool:
+        # Here we only update the cells that have changed, all in one request
+        # Prevents conflicts, and the cost doesn't grow with the sheet size
+        data, _ = self._write_data(cells)
+        return self._ssheet_inter.batch_update_ranges(data) is not None
+
+    def commit_cells(self, cells: dict[tuple[int, str], object]
+                     ) -> dict[tuple[int, str], object] | None:
+        # The same request returns the values after the write
+        data, ranges = self._write_data(cells)
+        response = self._ssheet_inter.batch_update_ranges(
+            data, include_values=True)
+        if response is None:
+            return None
+        stored = {}
+        for (sheet, col, start, stop), update in zip(
+                ranges, response.get('responses', [])):
+            # Trailing empty cells are not returned
+            values = update.get('updatedData', {}).get('values', [])
+            for row in range(start, stop):
+                raw = (values[row - start][0]
+                       if row - start < len(values) and values[row - start]
+                       else None)
+                stored[(sheet*SOURCE_ROW_STRIDE + row, col)] = parse_cell(
+                    raw, col)
+        return stored
+
+
+class MultiOrderStore(OrderStore):
+    """
+    Orders of several sources, e.g. print queues, merged into one frame with
+    a SOURCE column. Sources are grouped in stores, like the sheets of one
+    spreadsheet, which are queried concurrently: a refresh takes about as
+    long as the slowest store. Orders of the n-th source have ROW_ID
+    n*SOURCE_ROW_STRIDE+row, and each store numbers its own sources from 0.
+    """
+    def __init__(self, stores: list[tuple[OrderStore, list[str]]]) -> None:
+        """stores is a list of (store, names of the sources it has)"""
+        self._stores = [store for store, _ in stores]
+        self._source_names = [name for _, names in stores for name in names]
+        # Source number of the first source of each store
+        self._first_sources = np.cumsum(
+            [0] + [len(names) for _, names in stores[:-1]]).tolist()
+        self._executor = ThreadPoolExecutor(
+            max_workers=len(stores), thread_name_prefix='order_store')
+
+    def _to_global(self, store: int, row_ids) -> np.ndarray:
+        sources, rows = np.divmod(np.asarray(row_ids, dtype=np.int64),
+                                  SOURCE_ROW_STRIDE)
+        return (sources + self._first_sources[store])*SOURCE_ROW_STRIDE + rows
+
+    def _to_store(self, row_id: int) -> tuple[int, int]:
+        """(store, row_id within it) of a global row_id"""
+        source, row = divmod(row_id, SOURCE_ROW_STRIDE)
+        store = bisect_right(self._first_sources, source) - 1
+        return (store, (source - self._first_sources[store])*SOURCE_ROW_STRIDE
+                + row)
+
+    def _split(self, cells: dict[tuple[int, str], object]) -> list[dict]:
+        """Cells of each store, by their row_id within it"""
+        by_store = [{} for _ in self._stores]
+        for (row_id, col), value in cells.items():
+            store, store_row_id = self._to_store(row_id)
+            by_store[store][(store_row_id, col)] = value
+        return by_store
+
+    def _tag(self, store: int, orders_df: pd.DataFrame) -> pd.DataFrame:
+        orders_df = orders_df.set_axis(
+            pd.Index(self._to_global(store, orders_df.index)), axis=0)
+        orders_df['SOURCE'] = pd.Categorical.from_codes(
+            orders_df.index.to_numpy() // SOURCE_ROW_STRIDE,
+            categories=self._source_names)
+        return orders_df
+
+    def _map(self, func, *args_list) -> list:
+        """func(store, *args) for every store, concurrently"""
+        futures = [self._executor.submit(func, store, *args)
+                   for store, *args in zip(self._stores, *args_list)]
+        return [future.result() for future in futures]
+
+    def read_chunks(self, chunk_size: int, newest_first: bool = False,
+                    throttle: Callable[[], None] | None = None
+                    ) -> Iterator[pd.DataFrame | None]:
+        # Store after store, their ROW_IDs are in the same order
+        store_nums = range(len(self._stores))
+        for store_num in reversed(store_nums) if newest_first else store_nums:
+            for orders_df in self._stores[store_num].read_chunks(
+                    chunk_size, newest_first, throttle):
+                if orders_df is None:
+                    yield None
+                    return
+                yield self._tag(store_num, orders_df)
+
+    def read(self) -> pd.DataFrame | None:
+        orders = self._map(lambda store: store.read())
+        if any(orders_df is None for orders_df in orders):
+            return None
+        return apply_dtypes(pd.concat(
+            [self._tag(store, orders_df)
+             for store, orders_df in enumerate(orders)]).sort_index())
+
+    def read_pending(self, watermark: Watermark) -> pd.DataFrame | None:
+        starts = [[] for _ in self._stores]
+        rows = [[] for _ in self._stores]
+        for start in watermark.starts:
+            store, store_row_id = self._to_store(start)
+            starts[store].append(store_row_id)
+        for row_id in watermark.rows:
+            store, store_row_id = self._to_store(row_id)
+            rows[store].append(store_row_id)
+        orders = self._map(
+            lambda store, store_starts, store_rows: store.read_pending(
+                Watermark(store_starts, store_rows)),
+            starts, rows)
+        if any(orders_df is None for orders_df in orders):
+            return None
+        return apply_dtypes(pd.concat(
+            [self._tag(store, orders_df)
+             for store, orders_df in enumerate(orders)]).sort_index())
+
+    def revision(self) -> list | None:
+        revisions = self._map(lambda store: store.revision())
+        return None if None in revisions else revisions
+
+    def changed_since(self, revision=None) -> OrderChanges | None:
+        changes = self._map(lambda store, rev: store.changed_since(rev),
+                            revision or [None]*len(self._stores))
+        if any(store_changes is None for store_changes in changes):
+            return None
+        return OrderChanges(
+            apply_dtypes(pd.concat(
+                [self._tag(store, store_changes.orders)
+                 for store, store_changes in enumerate(changes)]
+            ).sort_index()),
+            [row_id for store, store_changes in enumerate(changes)
+             for row_id in self._to_global(store,
+                                           store_changes.removed).tolist()],
+            [store_changes.revision for store_changes in changes])
+
+    def write_cells(self, cells: dict[tuple[int, str], object]) -> bool:
+        by_store = self._split(cells)
+        written = self._map(
+            lambda store, store_cells: (not store_cells
+                                        or store.write_cells(store_cells)),
+            by_store)
+        return all(written)
+
+    def commit_cells(self, cells: dict[tuple[int, str], object]
+                     ) -> dict[tuple[int, str], object] | None:
+        by_store = self._split(cells)
+        committed = self._map(
+            lambda store, store_cells: (store.commit_cells(store_cells)
+                                        if store_cells else {}),
+            by_store)
+        if any(stored is None for stored in committed):
+            return None
+        return {
+            (int(self._to_global(store, [row_id])[0]), col): value
+            for store, stored in enumerate(committed)
+            for (row_id, col), value in stored.items()}
+
+
+def _to_sql_values(orders_df: pd.DataFrame) -> list[tuple]:
+    """Rows of (ROW_ID, *columns) with values SQLite can store"""
+    columns = [orders_df.index.to_numpy(dtype=object)]
+    for col in constants.COLUMN_NAMES:
+        if constants.COLUMN_DTYPES[col].startswith('datetime'):
+            values = orders_df[col].dt.strftime('%Y-%m-%dT%H:%M:%S')
+        else:
+            values = orders_df[col]
+        columns.append(values.to_numpy(dtype=object, na_value=None))
+    return list(zip(*columns))
+
+
+def _from_sql(orders_df: pd.DataFrame) -> pd.DataFrame:
+    """Restores the dtypes of orders read with pandas.read_sql_query"""
+    for col, dtype in constants.COLUMN_DTYPES.items():
+        values = orders_df[col]
+        if dtype.startswith('datetime'):
+            orders_df[col] = pd.to_datetime(values, errors='coerce')
+        elif dtype == 'bool':
+            orders_df[col] = values.fillna(0).astype(bool)
+        elif dtype == 'Int64':
+            orders_df[col] = pd.to_numeric(values).astype('Int64')
+        elif dtype == 'object':
+            orders_df[col] = values.fillna('').astype(str)
+        else:
+            orders_df[col] = values.astype(dtype)
+    return orders_df
+
+
+class SqliteOrderStore(OrderStore):
+    """
+    Orders in an SQLite file, one row per order, each tagged with the
+    revision that last changed it. Removed orders leave a tombstone, so
+    changed_since is a lookup on the revision indexes.
+    A connection is opened per call, so it can be used from any thread.
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        columns = ', '.join(f'"{col}"' for col in constants.COLUMN_NAMES)
+        self._select = f'SELECT ROW_ID, {columns} FROM orders'
+        self._statuses_set = ' + '.join(f'IFNULL("{cb_id.name}", 0)'
+                                        for cb_id in constants.CBId)
+        with closing(self._connect()) as con, con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute(f'CREATE TABLE IF NOT EXISTS orders ('
+                        f'ROW_ID INTEGER PRIMARY KEY, {columns}, '
+                        f'revision INTEGER NOT NULL)')
+            con.execute('CREATE INDEX IF NOT EXISTS orders_revision '
+                        'ON orders (revision)')
+            con.execute('CREATE TABLE IF NOT EXISTS removed ('
+                        'ROW_ID INTEGER PRIMARY KEY, '
+                        'revision INTEGER NOT NULL)')
+            con.execute('CREATE INDEX IF NOT EXISTS removed_revision '
+                        'ON removed (revision)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=10)
+
+    @staticmethod
+    def _revision(con: sqlite3.Connection) -> int:
+        return con.execute(
+            'SELECT MAX(IFNULL((SELECT MAX(revision) FROM orders), 0), '
+            'IFNULL((SELECT MAX(revision) FROM removed), 0))').fetchone()[0]
+
+    def _query(self, con: sqlite3.Connection, where: str = '',
+               params: tuple = ()) -> pd.DataFrame:
+        # Sorting in SQL would scan the table instead of using the index
+        return _from_sql(pd.read_sql_query(
+            f'{self._select} {where}', con,
+            index_col='ROW_ID', params=params)).sort_index()
+
+    def read(self) -> pd.DataFrame | None:
+        try:
+            with closing(self._connect()) as con:
+                return self._query(con)
+        except sqlite3.Error as err:
+            print(err)
+            return None
+
+    def revision(self) -> int | None:
+        try:
+            with closing(self._connect()) as con:
+                return self._revision(con)
+        except sqlite3.Error as err:
+            print(err)
+            return None
+
+    def read_chunks(self, chunk_size: int, newest_first: bool = False,
+                    throttle: Callable[[], None] | None = None
+                    ) -> Iterator[pd.DataFrame | None]:
+        # From the last ROW_ID seen, a lookup on the primary key. Local, not
+        # throttled
+        last_row = 2**63 - 1 if newest_first else -1
+        condition = ('WHERE ROW_ID < ? ORDER BY ROW_ID DESC LIMIT ?'
+                     if newest_first
+                     else 'WHERE ROW_ID > ? ORDER BY ROW_ID LIMIT ?')
+        while True:
+            try:
+                with closing(self._connect()) as con:
+                    orders_df = self._query(con, condition,
+                                            (last_row, chunk_size))
+            except sqlite3.Error as err:
+                print(err)
+                yield None
+                return
+            if orders_df.empty:
+                return
+            if newest_first:
+                orders_df = orders_df.iloc[::-1]
+                chunk_size *= 2
+            yield orders_df
+            last_row = int(orders_df.index[-1])
+
+    def changed_since(self, revision=None) -> OrderChanges | None:
+        try:
+            with closing(self._connect()) as con, con:
+                # Read everything in one transaction, for a consistent view
+                con.execute('BEGIN')
+                new_revision = self._revision(con)
+                if revision is None:
+                    return OrderChanges(self._query(con), [], new_revision)
+                orders_df = self._query(con, 'WHERE revision > ?',
+                                        (revision,))
+                removed = [row for row, in con.execute(
+                    'SELECT ROW_ID FROM removed WHERE revision > ?',
+                    (revision,))]
+                return OrderChanges(orders_df, removed, new_revision)
+        except sqlite3.Error as err:
+            print(err)
+            return None
+
+    def write_cells(self, cells: dict[tuple[int, str], object]) -> bool:
+        """
+        Like OrderStore.write_cells. Orders whose statuses change get their
+        COMPLETION derived again, as the share of statuses set, like the
+        spreadsheet formula does
+        """
+        try:
+            with closing(self._connect()) as con, con:
+                revision = self._revision(con) + 1
+                for (row, col), value in cells.items():
+                    if col not in constants.COLUMN_DTYPES:
+                        raise KeyError(f'Unknown column {col}')
+                    cursor = con.execute(f'UPDATE orders SET "{col}" = ?, '
+                                         f'revision = ? WHERE ROW_ID = ?',
+                                         (value, revision, int(row)))
+                    # Rolled back, none is written
+                    if cursor.rowcount != 1:
+                        raise KeyError(f'No order with ROW_ID {row}')
+                status_rows = {int(row) for row, col in cells
+                               if col in constants.CBId.__members__}
+                con.executemany(
+                    f'UPDATE orders SET "COMPLETION" = '
+                    f'({self._statuses_set}) / {len(constants.CBId)}.0 '
+                    f'WHERE ROW_ID = ?',
+                    [(row,) for row in status_rows])
+            return True
+        except (sqlite3.Error, KeyError) as err:
+            print(err)
+            return False
+
+    def replace(self, orders_df: pd.DataFrame) -> None:
+        """
+        Replaces the stored orders with orders_df, e.g. to import them from
+        another store. Orders not in orders_df are removed
+        """
+        n_values = len(constants.COLUMN_NAMES) + 1
+        placeholders = ', '.join(['?']*n_values)
+        try:
+            with closing(self._connect()) as con, con:
+                revision = self._revision(con) + 1
+                old_rows = {row for row, in con.execute(
+                    'SELECT ROW_ID FROM orders')}
+                removed = old_rows.difference(orders_df.index)
+                con.executemany('DELETE FROM orders WHERE ROW_ID = ?',
+                                [(row,) for row in removed])
+                con.executemany('INSERT OR REPLACE INTO removed '
+                                'VALUES (?, ?)',
+                                [(row, revision) for row in removed])
+                con.executemany(f'INSERT OR REPLACE INTO orders '
+                                f'VALUES ({placeholders}, {revision})',
+                                _to_sql_values(orders_df))
+                con.execute('DELETE FROM removed WHERE ROW_ID IN '
+                            '(SELECT ROW_ID FROM orders)')
+        except sqlite3.Error as err:
+            print(err)
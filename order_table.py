@@ -0,0 +1,117 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module keeps the shown orders as plain columns, so the UI can
+look up and change single orders without going through pandas"""
+
+import numpy as np
+import pandas as pd
+
+
+class OrderRow:
+    """
+    View of one order of an OrderTable, read like an order Series:
+    row['NAME']. Missing values are None, or NaN/NaT in NumPy columns
+    """
+    __slots__ = ('_table', '_pos')
+
+    def __init__(self, table: 'OrderTable', pos: int) -> None:
+        self._table = table
+        self._pos = pos
+
+    def __getitem__(self, col: str):
+        return self._table.columns[col][self._pos]
+
+    @property
+    def row_id(self) -> int:
+        """ID (row index) of the order"""
+        return self._table.row_ids[self._pos]
+
+
+class OrderTable:
+    """
+    Orders as one NumPy array per column, plus a row_id -> position index.
+    Lookups and single cell changes are O(1). Columns with a NumPy dtype keep
+    it, the others (nullable, categorical, text) become object arrays
+    """
+    __slots__ = ('row_ids', 'columns', '_ids', '_positions')
+
+    def __init__(self, orders_df: pd.DataFrame,
+                 mask: np.ndarray | None = None) -> None:
+        """Takes the orders in orders_df, only those in mask if given"""
+        index = orders_df.index.to_numpy()
+        self._ids = index if mask is None else index[mask]
+        self.row_ids = self._ids.tolist()
+        self.columns = {}
+        for col in orders_df.columns:
+            series = orders_df[col]
+            if isinstance(series.dtype, np.dtype) and series.dtype != object:
+                values = series.to_numpy()
+            else:
+                # Missing values as None, so they compare equal to each other
+                values = series.to_numpy(dtype=object, na_value=None)
+            # Copied either way, so changes don't reach orders_df
+            self.columns[col] = (values.copy() if mask is None
+                                 else values[mask])
+        self._positions = {
+            row_id: pos for pos, row_id in enumerate(self.row_ids)}
+
+    def __len__(self) -> int:
+        return len(self.row_ids)
+
+    def __contains__(self, row_id) -> bool:
+        return row_id in self._positions
+
+    def position(self, row_id) -> int:
+        """Position of the order with row_id, KeyError if not in the table"""
+        return self._positions[row_id]
+
+    def row(self, row_id) -> OrderRow:
+        """View of the order with row_id, KeyError if not in the table"""
+        return OrderRow(self, self._positions[row_id])
+
+    def set(self, row_id, col: str, value) -> None:
+        """Changes one value, in place"""
+        self.columns[col][self._positions[row_id]] = value
+
+    def changed_ids(self, other: 'OrderTable') -> set:
+        """
+        Row ids in both tables whose values differ. Compared column by
+        column, as whole arrays
+        """
+        common, own_pos, other_pos = np.intersect1d(
+            self._ids, other._ids,  # pylint: disable=protected-access
+            assume_unique=True, return_indices=True)
+        if self.columns.keys() != other.columns.keys():
+            return set(common.tolist())
+        changed = np.zeros(len(common), dtype=bool)
+        for col, values in self.columns.items():
+            own, others = values[own_pos], other.columns[col][other_pos]
+            if own.dtype != others.dtype:
+                changed[:] = True
+                break
+            differ = own != others
+            if own.dtype.kind in 'fmM':
+                # NaN and NaT are never equal to themselves
+                differ &= ~(pd.isna(own) & pd.isna(others))
+            changed |= differ
+        return set(common[changed].tolist())
@@ -0,0 +1,314 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Command line tool to export the orders, and to change the status
+of many of them at once, without the GUI. Orders are read in chunks, so
+memory use does not grow with the number of orders"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+from functools import partial
+from typing import Callable, Iterator, TextIO
+
+import numpy as np
+import pandas as pd
+
+import constants
+from order_sources import load_config, create_order_store
+from order_store import OrderStore
+from sync_scheduler import SYNC_BURST, SYNC_RATE_LIMIT, TokenBucket
+
+# Orders read per request. Requests share the app's rate limit, so large
+# sheets are read in few of them
+CHUNK_SIZE = 5000
+# Most cells written per request
+UPDATE_BATCH_SIZE = 5000
+# Columns an update file can change
+STATUS_COLUMNS = [cb_id.name for cb_id in constants.CBId]
+# Columns an update file can identify orders by, in order of preference
+KEY_COLUMNS = ['ROW_ID', 'REF']
+
+_TRUE_TEXTS = {'true', '1', 'x', 'yes', 'si', 'sí'}
+_FALSE_TEXTS = {'false', '0', '', 'no'}
+
+
+def _parse_bool(text: str) -> bool:
+    text = str(text).strip().lower()
+    if text in _TRUE_TEXTS:
+        return True
+    if text in _FALSE_TEXTS:
+        return False
+    raise ValueError(f'Not a checkbox value: {text!r}')
+
+
+def _parse_where(text: str) -> tuple[str, str | bool | float]:
+    """
+    COLUMN=VALUE, as given to --where. VALUE is parsed as the column's
+    dtype when it is a checkbox or a number
+    """
+    col, sep, value = text.partition('=')
+    if not sep or (col not in constants.COLUMN_DTYPES and col != 'SOURCE'):
+        raise argparse.ArgumentTypeError(
+            f'Expected COLUMN=VALUE with a known column, got {text!r}')
+    dtype = constants.COLUMN_DTYPES.get(col)
+    try:
+        if dtype in ('bool', 'boolean'):
+            return col, _parse_bool(value)
+        if dtype in ('float64', 'Int64'):
+            return col, float(value)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError(f'{col}: {err}') from err
+    return col, value
+
+
+def _filter(orders_df: pd.DataFrame, pending_only: bool,
+            where: list[tuple[str, str | bool | float]]) -> pd.DataFrame:
+    """Pending orders (as shown by the app) with every value in where"""
+    mask = pd.Series(True, index=orders_df.index)
+    if pending_only:
+        mask &= orders_df['COMPLETION'] != 1
+    for col, value in where:
+        if col not in orders_df:
+            return orders_df.iloc[:0]
+        values = orders_df[col]
+        if isinstance(value, (bool, float)):
+            mask &= (values == value).fillna(False)
+        else:
+            mask &= values.astype(str) == value
+    return orders_df[mask.to_numpy(dtype=bool)]
+
+
+def export_orders(chunks: Iterator[pd.DataFrame | None], output: TextIO,
+                  output_format: str, *, pending_only: bool = True,
+                  where: list[tuple[str, str | bool | float]] = ()
+                  ) -> int | None:
+    """
+    Writes the orders in chunks to output, as CSV or JSON Lines, with their
+    ROW_ID. Returns how many were written, None if they could not be read
+    """
+    n_orders = 0
+    for orders_df in chunks:
+        if orders_df is None:
+            return None
+        orders_df = _filter(orders_df, pending_only, where)
+        if orders_df.empty:
+            continue
+        orders_df = orders_df.rename_axis('ROW_ID')
+        if output_format == 'csv':
+            orders_df.to_csv(output, header=n_orders == 0)
+        else:
+            output.write(orders_df.reset_index().to_json(
+                orient='records', lines=True, date_format='iso',
+                force_ascii=False).rstrip('\n') + '\n')
+        n_orders += len(orders_df)
+    return n_orders
+
+
+def _parse_record(line: str) -> dict:
+    """A JSON Lines record, ValueError if it is not a JSON object"""
+    try:
+        record = json.loads(line)
+    except ValueError as err:
+        raise ValueError(f'Not a JSON record: {line.strip()!r}') from err
+    if not isinstance(record, dict):
+        raise ValueError(f'Not a JSON object: {line.strip()!r}')
+    return record
+
+
+def read_updates(path: str) -> tuple[str, list[tuple[int, str, bool]]]:
+    """
+    Status changes in a CSV or, if path ends in .jsonl, JSON Lines file.
+    Each record has ROW_ID or REF, and some of STATUS_COLUMNS; those left
+    empty are not changed. Returns the key column used and
+    [(key, column, value)]. Raises ValueError if the file is not valid
+    """
+    with open(path, newline='', encoding='utf-8') as updates_file:
+        if path.endswith('.jsonl'):
+            records = [_parse_record(line)
+                       for line in updates_file if line.strip()]
+        else:
+            records = list(csv.DictReader(updates_file))
+    fields = set().union(*records) if records else set()
+    key_col = next((col for col in KEY_COLUMNS if col in fields), None)
+    if key_col is None:
+        raise ValueError(f'Updates need one of the columns {KEY_COLUMNS}')
+    status_cols = [col for col in STATUS_COLUMNS if col in fields]
+    if not status_cols:
+        raise ValueError(f'Updates need some of the columns {STATUS_COLUMNS}')
+    updates = []
+    for line, record in enumerate(records, start=1):
+        if record.get(key_col) in (None, ''):
+            raise ValueError(f'Record {line}: {key_col} missing')
+        try:
+            key = int(record[key_col])
+        except (TypeError, ValueError) as err:
+            raise ValueError(f'Record {line}, {key_col}: {err}') from err
+        for col in status_cols:
+            if record.get(col) in (None, ''):
+                continue
+            try:
+                updates.append((key, col, _parse_bool(record[col])))
+            except ValueError as err:
+                raise ValueError(f'Record {line}, {col}: {err}') from err
+    return key_col, updates
+
+
+def _find_orders(chunks: Iterator[pd.DataFrame | None], key_col: str,
+                 keys: set) -> dict | None:
+    """
+    {key: [ROW_ID]} of the orders with those keys, None if not readable.
+    With several sources, each numbers its own REFs
+    """
+    row_ids = {}
+    for orders_df in chunks:
+        if orders_df is None:
+            return None
+        found = (orders_df.index if key_col == 'ROW_ID'
+                 else orders_df[key_col])
+        matches = np.asarray(found.isin(keys), dtype=bool)
+        for key, row_id in zip(found[matches].tolist(),
+                               orders_df.index[matches].tolist()):
+            row_ids.setdefault(key, []).append(row_id)
+    return row_ids
+
+
+def _throttle(config: dict) -> Callable[[], None]:
+    """Waits for a token before each request, at the rate of the app's"""
+    bucket = TokenBucket(config.get('SYNC_RATE_LIMIT', SYNC_RATE_LIMIT)/60,
+                         config.get('SYNC_BURST', SYNC_BURST))
+    return partial(bucket.take, 1)
+
+
+def update_orders(order_store: OrderStore, key_col: str,
+                  updates: list[tuple[int, str, bool]], *,
+                  dry_run: bool = False,
+                  batch_size: int = UPDATE_BATCH_SIZE,
+                  throttle: Callable[[], None] | None = None) -> bool:
+    """
+    Writes the status changes, UPDATE_BATCH_SIZE cells per request, after
+    checking every order exists. If a request fails, those before it stay
+    written. throttle, if given, is called before each request. Returns
+    whether everything was written
+    """
+    keys = {key for key, _, _ in updates}
+    row_ids = _find_orders(
+        order_store.read_chunks(CHUNK_SIZE, throttle=throttle), key_col, keys)
+    if row_ids is None:
+        print('Error reading orders.')
+        return False
+    missing = keys.difference(row_ids)
+    if missing:
+        print(f'Orders not found, nothing written. {key_col}: '
+              f'{sorted(missing)}')
+        return False
+    ambiguous = [key for key, key_row_ids in row_ids.items()
+                 if len(key_row_ids) > 1]
+    if ambiguous:
+        print(f'Several orders found, nothing written. Use ROW_ID. '
+              f'{key_col}: {sorted(ambiguous)}')
+        return False
+    # Later changes of a cell replace earlier ones
+    cells = list({(row_ids[key][0], col): value
+                  for key, col, value in updates}.items())
+    if dry_run:
+        print(f'{len(cells)} cells of {len(keys)} orders would be written')
+        return True
+    for first in range(0, len(cells), batch_size):
+        if throttle is not None:
+            throttle()
+        if not order_store.write_cells(dict(cells[first:first + batch_size])):
+            print(f'Error writing orders, {first} of {len(cells)} cells '
+                  'were written.')
+            return False
+    print(f'{len(cells)} cells of {len(keys)} orders written in '
+          f'{-(-len(cells)//batch_size)} requests')
+    return True
+
+
+def main() -> int:
+    """Runs the command given in the command line, returns the exit code"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest='command', required=True)
+    export_parser = commands.add_parser(
+        'export', help='write pending orders as CSV or JSON Lines')
+    export_parser.add_argument('--format', choices=['csv', 'jsonl'],
+                               default='csv')
+    export_parser.add_argument('--all', action='store_true',
+                               help='completed orders too')
+    export_parser.add_argument(
+        '--where', type=_parse_where, action='append', default=[],
+        metavar='COLUMN=VALUE', help='only orders with this value, '
+        'e.g. PRINTER=Prusa or PAID=false. Can be repeated')
+    export_parser.add_argument('--output', '-o',
+                               help='file to write to, stdout by default')
+    update_parser = commands.add_parser(
+        'update', help='change the status of the orders in a file')
+    update_parser.add_argument(
+        'file', help=f'CSV, or JSON Lines if it ends in .jsonl, with '
+        f'ROW_ID or REF and some of {", ".join(STATUS_COLUMNS)}')
+    update_parser.add_argument('--dry-run', action='store_true',
+                               help='check the file, but write nothing')
+    args = parser.parse_args()
+
+    if args.command == 'update' and not os.path.isfile(args.file):
+        print(f'{args.file} not found')
+        return 1
+    config = load_config()
+    order_store = create_order_store(config)
+    throttle = _throttle(config)
+
+    if args.command == 'export':
+        output = (open(args.output, 'w', newline='', encoding='utf-8')
+                  if args.output else sys.stdout)
+        try:
+            n_orders = export_orders(
+                order_store.read_chunks(CHUNK_SIZE, throttle=throttle),
+                output, args.format,
+                pending_only=not args.all, where=args.where)
+        except BrokenPipeError:
+            # Output closed early, e.g. piped to head. Python would complain
+            # again when flushing stdout at exit
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return 1
+        finally:
+            if args.output:
+                output.close()
+        if n_orders is None:
+            print('Error reading orders.', file=sys.stderr)
+            return 1
+        print(f'{n_orders} orders exported', file=sys.stderr)
+        return 0
+
+    try:
+        key_col, updates = read_updates(args.file)
+    except ValueError as err:
+        print(err)
+        return 1
+    return 0 if update_orders(order_store, key_col, updates,
+                              dry_run=args.dry_run, throttle=throttle) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module builds the typed orders DataFrame from the raw rows
+fetched from the spreadsheet, column by column"""
+
+from itertools import zip_longest
+
+import numpy as np
+import pandas as pd
+
+import constants
+
+
+def _convert_column(values: pd.Series, dtype: str) -> pd.Series:
+    """Converts a column of raw values to its dtype in constants"""
+    if dtype == 'datetime64[ns]':
+        return pd.to_datetime(values, format=constants.TEMP_FORMAT,
+                              errors='coerce')
+    if dtype == 'bool':
+        # Checkboxes: anything but a checked one is False
+        return values.isin([True])
+    if dtype == 'boolean':
+        return values.map({True: True, False: False}).astype('boolean')
+    if dtype == 'float64':
+        return pd.to_numeric(values, errors='coerce').astype('float64')
+    if dtype == 'Int64':
+        return pd.to_numeric(values, errors='coerce').astype('Int64')
+    if dtype == 'category':
+        return values.where(values != '').astype('category')
+    # Text
+    return values.fillna('').astype(str)
+
+
+def privacy_protect_names(names: pd.Series) -> pd.Series:
+    """
+    Keeps the first name and the initial of the rest of names, vectorized.
+    'Nombre apellido otro' -> 'Nombre A. O.'
+    Names repeat between orders, so each distinct name is done only once
+    """
+    codes, uniques = pd.factorize(names)
+    uniques = pd.Series(uniques, dtype=object).str.strip()
+    first = uniques.str.extract(r'^(\S*)', expand=False)
+    initials = (uniques
+                .str.replace(r'^\S*', '', regex=True)
+                .str.replace(r'\s+(\S)\S*', r' \1.', regex=True)
+                .str.upper())
+    return pd.Series((first + initials).to_numpy()[codes], index=names.index,
+                     dtype=object)
+
+
+def apply_dtypes(orders_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Restores dtypes lost when joining order frames, i.e. categoricals with
+    different categories
+    """
+    return orders_df.astype({
+        col: dtype for col, dtype in constants.COLUMN_DTYPES.items()
+        if dtype == 'category' and orders_df[col].dtype != 'category'})
+
+
+def parse_orders(orders_raw: list[list] | None,
+                 first_row: int = 0) -> pd.DataFrame | None:
+    """
+    Builds the orders DataFrame from raw sheet rows, with the dtypes in
+    constants.COLUMN_DTYPES. first_row is the index given to the first of
+    them. Returns None if the rows could not be parsed
+    """
+    if orders_raw is None:
+        return None
+    n_cols = len(constants.COLUMN_NAMES)
+    try:
+        index = pd.RangeIndex(first_row, first_row + len(orders_raw))
+        lengths = np.fromiter(map(len, orders_raw), dtype=int,
+                              count=len(orders_raw))
+        # Transpose rows into columns, shorter rows padded with None
+        columns = list(zip_longest(*orders_raw, fillvalue=None))[:n_cols]
+        columns += [(None,) * len(orders_raw)] * (n_cols - len(columns))
+        orders_df = pd.DataFrame({
+            col: _convert_column(
+                pd.Series(values, index=index, dtype=object),
+                constants.COLUMN_DTYPES[col])
+            for col, values in zip(constants.COLUMN_NAMES, columns)
+        })
+        # Yeah, we shouldn't show all the name. Privacy protection first.
+        orders_df['NAME'] = privacy_protect_names(orders_df['NAME'])
+        return orders_df[lengths >= constants.MIN_ROW_CELLS]
+
+    except (TypeError, ValueError) as err:
+        print('Error reading orders. Check database integrity.')
+        print(err)
+        return None
+
+
+def parse_cell(raw, col: str):
+    """
+    Converts a raw sheet value of column col as parse_orders would, to a
+    Python value. Missing values are None
+    """
+    value = _convert_column(pd.Series([raw], dtype=object),
+                            constants.COLUMN_DTYPES[col]).iloc[0]
+    if pd.isna(value):
+        return None
+    return value.item() if isinstance(value, np.generic) else value
@@ -22,59 +22,80 @@ __version__ = "1.0.0"
 __status__ = "Prototype"
 __doc__ = "This module provides the orders panel with its interactive elements"
 
+from bisect import bisect_left
+
 # pylint: disable=no-name-in-module, c-extension-no-member
-from PyQt6.QtWidgets import (QWidget, QScrollArea, QVBoxLayout, QHBoxLayout,
-                             QLabel, QGridLayout, QCheckBox, QSizePolicy,
-                             QButtonGroup)
+from PyQt6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                             QGridLayout, QCheckBox, QSizePolicy, QButtonGroup,
+                             QListView, QStyledItemDelegate, QStyle,
+                             QAbstractItemView, QStyleOptionViewItem,
+                             QLineEdit, QComboBox, QPushButton, QApplication)
 # pylint: enable=no-name-in-module
 from PyQt6 import QtCore, QtGui
+import numpy as np
 from numpy import integer
 import pandas as pd
 
 from constants import CBId, ORDER_PLACEHOLDER_SERIES
+from metrics import METRICS
+from order_table import OrderRow, OrderTable
+from order_search import OrderIndex
+
+# References listed when several orders are selected
+SELECTION_REFS_SHOWN = 10
 
 
 class PanelUI(QWidget):
-    """Scroll area and interactive elements which show the orders"""
+    """List view and interactive elements which show the orders"""
     def __init__(self, parent: QWidget | None, interaction_func) -> None:
         """
-        interaction_func is in form f(row_id, CBId, checked)
+        interaction_func is in form f(row_ids, CBId, checked), row_ids being
+        the list of orders selected
         """
         super().__init__(parent=parent)
-        self._orders_df = None
+        self._orders = None
+        self._search_index = OrderIndex()
         self._interact_func = interaction_func
 
-        self._row_id = None
+        self._selected_ids = []
         self._prev_selected = None
 
-        self.orders_elements_list = list([])
-
         self._init_ui()
 
     def _init_ui(self) -> None:
         self.main_v_layout = QVBoxLayout(self)
 
-        # Scroll Area
-        self.orders_scroll = QScrollArea(self)
-        self.orders_scroll.setVerticalScrollBarPolicy(
+        # Search & filters
+        self.filter_bar = _OrderFilterBar(self)
+        self.filter_bar.changed.connect(self._apply_filter)
+        self.filter_bar.select_all.connect(self._select_all)
+        self.main_v_layout.addWidget(self.filter_bar)
+        # !Search & filters
+        # Orders list
+        # Only the visible orders are painted, by the delegate, so its cost
+        # doesn't grow with the number of orders
+        self.orders_model = _OrdersListModel(self)
+        self.orders_list = _OrdersListView(self)
+        self.orders_list.setObjectName('ordersList')
+        self.orders_list.setModel(self.orders_model)
+        self.orders_list.setItemDelegate(_OrderDelegate(self.orders_list))
+        self.orders_list.setUniformItemSizes(True)
+        self.orders_list.setMouseTracking(True)  # For hover highlight
+        # Several orders with ctrl and shift, to change them all at once
+        self.orders_list.setSelectionMode(
+            QAbstractItemView.SelectionMode.ExtendedSelection)
+        self.orders_list.setVerticalScrollMode(
+            QAbstractItemView.ScrollMode.ScrollPerPixel)
+        self.orders_list.setVerticalScrollBarPolicy(
             QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOn)
-        self.orders_scroll.setHorizontalScrollBarPolicy(
+        self.orders_list.setHorizontalScrollBarPolicy(
             QtCore.Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
-        self.orders_scroll.setWidgetResizable(True)
+        self.orders_list.clicked.connect(self._on_index_clicked)
+        self.orders_list.selectionModel().selectionChanged.connect(
+            self._on_selection_changed)
 
-        # A QWidget is put into self, the scroll area, which has the vertical
-        # layout to be scrolled
-        self.column_wdgt = QWidget(self)
-        self.column_wdgt.setObjectName('scrollWidget')
-        self.column_lyt = QVBoxLayout(self.column_wdgt)
-        self.column_lyt.setAlignment(QtCore.Qt.AlignmentFlag.AlignTop)
-        self.orders_scroll.setWidget(self.column_wdgt)
-
-        self.main_v_layout.addWidget(
-            self.orders_scroll,
-            QtCore.Qt.AlignmentFlag.AlignTop
-        )
-        # !Scroll Area
+        self.main_v_layout.addWidget(self.orders_list)
+        # !Orders list
         # Order & Controls
         self.orders_and_controls = _OrderWithControls(
             self,
@@ -86,61 +107,525 @@ class PanelUI(QWidget):
         )
         # !Order & Controls
 
+    def _on_index_clicked(self, index: QtCore.QModelIndex):
+        modifiers = QApplication.keyboardModifiers()
+        if modifiers & (QtCore.Qt.KeyboardModifier.ControlModifier
+                        | QtCore.Qt.KeyboardModifier.ShiftModifier):
+            # The view already added or removed it from the selection
+            self._prev_selected = None
+            return
+        self._on_order_click_event(
+            index.data(_OrdersListModel.ROW_ID_ROLE))
+
     def _on_order_click_event(self, row_id):
         if self._prev_selected != row_id:
-            selected_data = self._orders_df.loc[row_id]
-            self.orders_and_controls.change_order(selected_data)
-            if self._prev_selected is None:
-                self.orders_and_controls.setDisabled(False)
+            # Only this one, even if others were selected
+            pos = self.orders_model.position(row_id)
+            if pos is not None:
+                self.orders_list.selectionModel().setCurrentIndex(
+                    self.orders_model.index(pos),
+                    QtCore.QItemSelectionModel.SelectionFlag.ClearAndSelect)
             # Save status
             self._prev_selected = row_id
-            self._row_id = row_id
         else:
-            self.orders_and_controls.change_order(ORDER_PLACEHOLDER_SERIES)
-            self.orders_and_controls.setDisabled(True)
+            self.orders_list.clearSelection()
             # Save status
             self._prev_selected = None
-            self._row_id = None
 
-    def set_orders(self, orders_df: pd.DataFrame):
+    def _on_selection_changed(self, *_):
+        self._show_selection(self.orders_model.row_ids_of(
+            self.orders_list.selectionModel().selection()))
+
+    def _select_all(self):
+        """Selects every order shown, i.e. matching the filter bar"""
+        self._prev_selected = None
+        self.orders_list.selectAll()
+        self.orders_list.setFocus()
+
+    def _show_selection(self, row_ids: list) -> None:
+        """Shows the selected orders, with controls for all of them"""
+        self._selected_ids = row_ids
+        if len(row_ids) != 1:
+            self._prev_selected = None
+        if not row_ids:
+            self.orders_and_controls.change_order(ORDER_PLACEHOLDER_SERIES)
+            self.orders_and_controls.setDisabled(True)
+            return
+        if len(row_ids) == 1:
+            self.orders_and_controls.change_order(self._orders.row(row_ids[0]))
+        else:
+            self.orders_and_controls.change_orders(self._orders, row_ids)
+        # Enable controls in case they were disabled while committing
+        self.orders_and_controls.setDisabled(False)
+
+    @METRICS.timed('set_orders')
+    def set_orders(self, orders_df: pd.DataFrame) -> bool:
         """
-        Given an orders DataFrame, create the orders widgets and add them to
-        the GUI
+        Given an orders DataFrame, show its pending orders in the list. Only
+        the orders added, removed or changed since last call are updated, and
+        the selected orders are kept if they are still pending.
+        Returns whether pending orders were added, removed or changed
         """
         # First of all, ignore completed tasks
-        orders_df = orders_df[orders_df['COMPLETION'] != 1]
-        # Clear selected order data, and last selected and save to class
-        self.orders_and_controls.change_order(ORDER_PLACEHOLDER_SERIES)
-        self.orders_and_controls.setDisabled(True)
-        self._orders_df = orders_df
-        self._prev_selected = None
-        # Delete all orders
-        for selectable_order in self.orders_elements_list:
-            self.column_lyt.removeWidget(selectable_order)
-            selectable_order.deleteLater()
-            selectable_order.setParent(None)
-        # Create a list of orders
-        self.orders_elements_list = [
-            _SelectableOrder(self, self._on_order_click_event, index, order)
-            for index, order in orders_df.iterrows()]
-        # Add new orders
-        for selectable_order in self.orders_elements_list:
-            self.column_lyt.insertWidget(0, selectable_order)
+        orders = OrderTable(
+            orders_df, (orders_df['COMPLETION'] != 1).to_numpy())
+        changed_ids = (set() if self._orders is None
+                       else orders.changed_ids(self._orders))
+        changed = (self._orders is None or bool(changed_ids)
+                   or orders.row_ids != self._orders.row_ids)
+        self._orders = orders
+        self._search_index.update(orders, changed_ids)
+        for col in _OrderFilterBar.VALUE_FACETS:
+            self.filter_bar.set_facet_values(
+                col, self._search_index.facet_values(col))
+        self.orders_model.set_orders(orders, changed_ids,
+                                     self._filtered_ids())
+        # Orders no longer shown left the selection with their rows. Show
+        # the latest data of the others
+        self._on_selection_changed()
+        return changed
+
+    def apply_cells(self, cells: dict) -> None:
+        """
+        Changes {(row_id, column): value} of the orders shown in place, e.g.
+        as stored after a write, without a full set_orders. Enables the
+        controls, in case they were disabled while committing
+        """
+        if self._orders is None:
+            return
+        changed_ids = set()
+        for (row_id, col), value in cells.items():
+            if row_id in self._orders and self._orders.row(row_id)[col] != value:
+                self._orders.set(row_id, col, value)
+                changed_ids.add(row_id)
+        if changed_ids:
+            self._search_index.update_orders(self._orders, list(changed_ids))
+        self._on_selection_changed()
 
     @property
     def row_id(self):
         """
         Returns the ID (row index) of the selected order, else None if no
-        row has been selected
+        row, or several, have been selected
         """
-        return self._row_id
+        return self._selected_ids[0] if len(self._selected_ids) == 1 else None
+
+    @property
+    def selected_ids(self) -> list:
+        """IDs (row indexes) of the selected orders, newest first"""
+        return list(self._selected_ids)
+
+    def _filtered_ids(self) -> set | None:
+        """Row ids of the orders matching the filter bar, None if empty"""
+        text, facets = self.filter_bar.query()
+        if not text.strip() and not facets:
+            return None
+        return self._search_index.search(text, facets)
+
+    @METRICS.timed('filter_orders')
+    def _apply_filter(self):
+        if self._orders is not None:
+            self.orders_model.set_visible(self._filtered_ids())
+            # Hidden orders are no longer selected
+            self._on_selection_changed()
+
+    @property
+    def orders(self) -> OrderTable | None:
+        """Pending orders shown, as last set and changed by the user"""
+        return self._orders
 
     def _interaction_wrapper(self, w_id, w_checked):
-        self._interact_func(self.row_id, w_id, w_checked)
+        row_ids = self.selected_ids
+        if row_ids:
+            # Keep them, in case they are selected again before next fetch.
+            # Texts in the list don't show it, so nothing to repaint there
+            col = CBId(w_id).name
+            for row_id in row_ids:
+                self._orders.set(row_id, col, w_checked)
+            self._search_index.update_orders(self._orders, row_ids)
+        self._interact_func(row_ids, w_id, w_checked)
+
+
+class _OrderFilterBar(QWidget):
+    """
+    Search box, select all button and one combo box per facet. First item
+    of each combo box means any value
+    """
+    changed = QtCore.pyqtSignal()
+    select_all = QtCore.pyqtSignal()
+
+    # Facets whose values are taken from the orders shown, hidden if none
+    VALUE_FACETS = {'SOURCE': 'Cola: todas',
+                    'PRINTER': 'Impresora: todas',
+                    'COLOUR_MATERIAL': 'Material: todos'}
+    FIXED_FACETS = {
+        'LOOKUP_MEMBER': ['Membresía: todas', ('Miembro verificado', True),
+                          ('No verificado', False), ('Sin verificar', None)],
+        'APPROVED': ['Aprobado: todos', ('Aprobado: sí', True),
+                     ('Aprobado: no', False)],
+        'PRINTED': ['Impreso: todos', ('Impreso: sí', True),
+                    ('Impreso: no', False)],
+        'PICKED_UP': ['Recogido: todos', ('Recogido: sí', True),
+                      ('Recogido: no', False)],
+        'PAID': ['Pagado: todos', ('Pagado: sí', True),
+                 ('Pagado: no', False)],
+    }
+
+    def __init__(self, parent: QWidget | None) -> None:
+        super().__init__(parent=parent)
+        self.main_v_layout = QVBoxLayout(self)
+        self.main_v_layout.setContentsMargins(0, 0, 0, 0)
+
+        self.search_edit = QLineEdit(self)
+        self.search_edit.setPlaceholderText(
+            'Buscar por nombre, comentario o referencia')
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.textChanged.connect(self.changed)
+        self.select_all_button = QPushButton('Seleccionar todos', self)
+        self.select_all_button.clicked.connect(self.select_all)
+        self.search_layout = QHBoxLayout()
+        self.search_layout.addWidget(self.search_edit)
+        self.search_layout.addWidget(self.select_all_button)
+        self.main_v_layout.addLayout(self.search_layout)
+
+        self.facets_layout = QGridLayout()
+        self.main_v_layout.addLayout(self.facets_layout)
+        self._combos = {}
+        # Source last, so when hidden there is no gap
+        for col in ['PRINTER', 'COLOUR_MATERIAL', *self.FIXED_FACETS,
+                    'SOURCE']:
+            if col in self.VALUE_FACETS:
+                self._add_combo(col, [self.VALUE_FACETS[col]])
+                self._combos[col].setVisible(False)
+            else:
+                self._add_combo(col, self.FIXED_FACETS[col])
+
+    def _add_combo(self, col: str, items: list) -> None:
+        combo = QComboBox(self)
+        combo.addItem(items[0], None)
+        for text, value in items[1:]:
+            # Wrapped, as None is a value too
+            combo.addItem(text, (value,))
+        combo.currentIndexChanged.connect(self.changed)
+        position = len(self._combos)
+        self.facets_layout.addWidget(combo, position // 4, position % 4)
+        self._combos[col] = combo
+
+    def set_facet_values(self, col: str, values: list) -> None:
+        """Sets the values to choose from, keeping the chosen one"""
+        combo = self._combos[col]
+        combo.setVisible(bool(values))
+        if [combo.itemData(i)[0] for i in range(1, combo.count())] == values:
+            return
+        chosen = combo.currentData()
+        combo.blockSignals(True)
+        while combo.count() > 1:
+            combo.removeItem(1)
+        for value in values:
+            combo.addItem(str(value), (value,))
+        combo.setCurrentIndex(max(0, combo.findData(chosen)))
+        combo.blockSignals(False)
+        if combo.currentData() != chosen:
+            self.changed.emit()
+
+    def query(self) -> tuple[str, dict]:
+        """Search text, and {column: value} of the facets chosen"""
+        return self.search_edit.text(), {
+            col: combo.currentData()[0]
+            for col, combo in self._combos.items()
+            if combo.currentData() is not None}
+
+
+def _order_texts(properties: OrderRow | pd.Series) -> dict:
+    """
+    From an order row or Series, returns the texts shown for it. 'member_state' is
+    the verified membership, True, False or None if unknown
+    """
+    member_state = (None if pd.isna(properties['LOOKUP_MEMBER'])
+                    else bool(properties['LOOKUP_MEMBER']))
+    return {
+        'ref': (
+            f"#{properties['REF']:0>4n}"
+            # https://stackoverflow.com/questions/40429917/in-python-how-would-you-check-if-a-number-is-one-of-the-integer-types
+            if isinstance(properties['REF'], (int, integer))
+            else f"#{properties['REF']}"
+        ),
+        'name': properties['NAME'],
+        'member': (
+            "Miembro verificado" if(member_state is True)
+            else "No verificado" if(member_state is False)
+            else "Membresía"  # if(member_state is None)
+        ),
+        'member_state': member_state,
+        'comment': properties['COMMENT'],
+        'layer_h': f"Altura capa: {properties['LAYER_H']}",
+        'rigidity': f"Rigidez: {properties['RIGIDITY']}/5",
+        'material': f"Material: {properties['COLOUR_MATERIAL']}",
+    }
+
+
+def _selection_texts(orders: OrderTable, row_ids: list) -> dict:
+    """Texts shown, alike _order_texts, for several orders selected at once"""
+    refs = [_order_texts(orders.row(row_id))['ref']
+            for row_id in row_ids[:SELECTION_REFS_SHOWN]]
+    if len(row_ids) > SELECTION_REFS_SHOWN:
+        refs.append('...')
+    return {
+        'ref': f'{len(row_ids)} pedidos',
+        'name': 'Selección múltiple',
+        'member': '',
+        'member_state': None,
+        'comment': ' '.join(refs),
+        'layer_h': '',
+        'rigidity': '',
+        'material': '',
+    }
+
+
+def _contiguous_runs(positions: list[int]) -> list[tuple[int, int]]:
+    """Groups sorted positions into contiguous (first, last) runs"""
+    runs = []
+    for pos in positions:
+        if runs and runs[-1][1] == pos - 1:
+            runs[-1][1] = pos
+        else:
+            runs.append([pos, pos])
+    return [(first, last) for first, last in runs]
+
+
+class _OrdersListModel(QtCore.QAbstractListModel):
+    """
+    List model over the pending orders table, newest first, optionally
+    filtered. Order texts are built when a row is first painted, and kept
+    until the order changes
+    """
+    ROW_ID_ROLE = QtCore.Qt.ItemDataRole.UserRole
+    TEXTS_ROLE = QtCore.Qt.ItemDataRole.UserRole + 1
+
+    def __init__(self, parent: QtCore.QObject | None) -> None:
+        super().__init__(parent)
+        self._orders = None
+        self._visible = None
+        self._row_ids = []
+        self._texts = {}
+
+    def set_orders(self, orders: OrderTable, changed_ids: set,
+                   visible: set | None = None) -> None:
+        """
+        Shows orders, those with row ids in visible if given. changed_ids
+        are the orders whose contents changed since last call
+        """
+        self._orders = orders
+        self._visible = visible
+        self._reconcile(changed_ids)
+
+    def set_visible(self, visible: set | None) -> None:
+        """Shows only the orders with row ids in visible, or all if None"""
+        self._visible = visible
+        self._reconcile(set())
+
+    def _reconcile(self, changed_ids: set) -> None:
+        """
+        Reconciles the shown rows with the orders, keyed by row index. Only
+        the rows removed, inserted or whose contents changed are signalled,
+        so the view keeps its selection and scroll position
+        """
+        new_ids = sorted(
+            self._orders.row_ids if self._visible is None
+            else self._visible.intersection(self._orders.row_ids),
+            reverse=True)
+        new_set = set(new_ids)
+        old_set = set(self._row_ids)
+        root = QtCore.QModelIndex()
+
+        removed = [pos for pos, row_id in enumerate(self._row_ids)
+                   if row_id not in new_set]
+        # Last ones first, so positions of the following runs stay valid
+        for first, last in reversed(_contiguous_runs(removed)):
+            self.beginRemoveRows(root, first, last)
+            for row_id in self._row_ids[first:last+1]:
+                self._texts.pop(row_id, None)
+            del self._row_ids[first:last+1]
+            self.endRemoveRows()
+
+        inserted = [pos for pos, row_id in enumerate(new_ids)
+                    if row_id not in old_set]
+        for first, last in _contiguous_runs(inserted):
+            self.beginInsertRows(root, first, last)
+            self._row_ids[first:first] = new_ids[first:last+1]
+            self.endInsertRows()
+
+        changed = [pos for pos, row_id in enumerate(new_ids)
+                   if row_id in changed_ids]
+        for pos in changed:
+            self._texts.pop(new_ids[pos], None)
+        for first, last in _contiguous_runs(changed):
+            self.dataChanged.emit(self.index(first), self.index(last))
+
+    def position(self, row_id) -> int | None:
+        """Row of the order shown with row_id, None if not shown"""
+        # Shown newest first, i.e. by descending row id
+        pos = bisect_left(self._row_ids, -row_id, key=lambda shown: -shown)
+        if pos < len(self._row_ids) and self._row_ids[pos] == row_id:
+            return pos
+        return None
+
+    def row_ids_of(self, selection: QtCore.QItemSelection) -> list:
+        """Row ids of the orders in a selection of the view, newest first"""
+        positions = set()
+        for selection_range in selection:
+            positions.update(range(selection_range.top(),
+                                   selection_range.bottom() + 1))
+        return [self._row_ids[pos] for pos in sorted(positions)
+                if pos < len(self._row_ids)]
+
+    def rowCount(self, parent: QtCore.QModelIndex = QtCore.QModelIndex()) -> int:  # pylint: disable=invalid-name, missing-function-docstring
+        return 0 if parent.isValid() else len(self._row_ids)
+
+    def data(self, index: QtCore.QModelIndex,
+             role: int = QtCore.Qt.ItemDataRole.DisplayRole):  # pylint: disable=missing-function-docstring
+        if not index.isValid():
+            return None
+        row_id = self._row_ids[index.row()]
+        if role == self.ROW_ID_ROLE:
+            return row_id
+        if role in (self.TEXTS_ROLE, QtCore.Qt.ItemDataRole.DisplayRole):
+            if row_id not in self._texts:
+                self._texts[row_id] = _order_texts(self._orders.row(row_id))
+            texts = self._texts[row_id]
+            return (texts if role == self.TEXTS_ROLE
+                    else f"{texts['ref']} {texts['name']}")
+        return None
+
+
+class _OrdersListView(QListView):
+    """
+    List of orders, painted by _OrderDelegate. The colours of the member's
+    name are set in styles.qss, as qproperty-verifiedMemberColour and
+    qproperty-unverifiedMemberColour of #ordersList. Without them, it is
+    painted as the rest of the text
+    """
+    def __init__(self, parent: QWidget | None) -> None:
+        super().__init__(parent)
+        self._member_colours = {True: QtGui.QColor(), False: QtGui.QColor()}
+
+    def member_colour(self, verified: bool | None) -> QtGui.QColor:
+        """Colour of the member's name, invalid if not styled"""
+        return self._member_colours.get(verified, QtGui.QColor())
+
+    def _set_verified_colour(self, colour: QtGui.QColor) -> None:
+        self._member_colours[True] = colour
+
+    def _set_unverified_colour(self, colour: QtGui.QColor) -> None:
+        self._member_colours[False] = colour
+
+    verifiedMemberColour = QtCore.pyqtProperty(  # pylint: disable=invalid-name
+        QtGui.QColor, lambda self: self._member_colours[True],
+        _set_verified_colour)
+    unverifiedMemberColour = QtCore.pyqtProperty(  # pylint: disable=invalid-name
+        QtGui.QColor, lambda self: self._member_colours[False],
+        _set_unverified_colour)
+
+
+class _OrderDelegate(QStyledItemDelegate):
+    """
+    Paints an order with the same layout as _OrderBaseElement:
+        REF      | NAME
+        MEMBER   | COMMENT
+        LAYER_H  | RIGIDITY | MATERIAL
+    Its background, border, margin and padding are the #ordersList::item
+    rules of styles.qss, painted and measured by the widget's style
+    """
+    SPACING = 6  # Space between rows and columns of text
+
+    def __init__(self, parent: QtCore.QObject | None) -> None:
+        super().__init__(parent)
+        self._big_font = None
+        self._bold_big_font = None
+
+    def _fonts(self, option: QStyleOptionViewItem):
+        if self._big_font is None:
+            self._big_font = QtGui.QFont(option.font)
+            self._big_font.setPixelSize(18)
+            self._bold_big_font = QtGui.QFont(self._big_font)
+            self._bold_big_font.setBold(True)
+        return self._big_font, self._bold_big_font
+
+    def _line_heights(self, option: QStyleOptionViewItem) -> tuple[int, int]:
+        big_font, _ = self._fonts(option)
+        return (QtGui.QFontMetrics(big_font).height(),
+                option.fontMetrics.height())
+
+    @staticmethod
+    def _content_rect(option: QStyleOptionViewItem) -> QtCore.QRect:
+        """Where the texts go: option.rect without margin, border, padding"""
+        return option.widget.style().subElementRect(
+            QStyle.SubElement.SE_ItemViewItemText, option, option.widget)
+
+    def sizeHint(self, option: QStyleOptionViewItem,
+                 index: QtCore.QModelIndex) -> QtCore.QSize:  # pylint: disable=invalid-name, missing-function-docstring
+        big_line, line = self._line_heights(option)
+        # What the style takes around the content, measured on a tall item
+        probe = QStyleOptionViewItem(option)
+        probe.rect = QtCore.QRect(0, 0, max(option.rect.width(), 1), 1000)
+        frame = probe.rect.height() - self._content_rect(probe).height()
+        return QtCore.QSize(
+            option.rect.width(),
+            frame + big_line + 2*line + 2*self.SPACING)
+
+    def paint(self, painter: QtGui.QPainter, option: QStyleOptionViewItem,
+              index: QtCore.QModelIndex) -> None:  # pylint: disable=missing-function-docstring
+        texts = index.data(_OrdersListModel.TEXTS_ROLE)
+        big_font, bold_big_font = self._fonts(option)
+        big_line, line = self._line_heights(option)
+
+        painter.save()
+        # Selected and hover states are ::item:selected and ::item:hover
+        option.widget.style().drawPrimitive(
+            QStyle.PrimitiveElement.PE_PanelItemViewItem, option, painter,
+            option.widget)
+
+        content = self._content_rect(option)
+        col_w = (content.width() - 2*self.SPACING) // 3
+        left, top = content.left(), content.top()
+        mid = left + col_w + self.SPACING
+        right = mid + col_w + self.SPACING
+        text_colour = option.palette.color(QtGui.QPalette.ColorRole.Text)
+
+        def draw(font, colour, x, y, width, height, text):
+            painter.setFont(font)
+            painter.setPen(colour)
+            elided = QtGui.QFontMetrics(font).elidedText(
+                str(text), QtCore.Qt.TextElideMode.ElideRight, width)
+            painter.drawText(
+                QtCore.QRect(x, y, width, height),
+                QtCore.Qt.AlignmentFlag.AlignLeft
+                | QtCore.Qt.AlignmentFlag.AlignVCenter,
+                elided)
+
+        wide = content.right() - mid
+        draw(bold_big_font, text_colour, left, top, col_w, big_line,
+             texts['ref'])
+        draw(big_font, text_colour, mid, top, wide, big_line, texts['name'])
+        top += big_line + self.SPACING
+        member_colour = option.widget.member_colour(texts['member_state'])
+        draw(option.font,
+             member_colour if member_colour.isValid() else text_colour,
+             left, top, col_w, line, texts['member'])
+        draw(option.font, text_colour, mid, top, wide, line, texts['comment'])
+        top += line + self.SPACING
+        draw(option.font, text_colour, left, top, col_w, line,
+             texts['layer_h'])
+        draw(option.font, text_colour, mid, top, col_w, line,
+             texts['rigidity'])
+        draw(option.font, text_colour, right, top,
+             content.right() - right, line, texts['material'])
+        painter.restore()
 
 
 class _OrderBaseElement(QWidget):
-    def __init__(self, parent: QWidget | None, properties: pd.Series) -> None:
+    def __init__(self, parent: QWidget | None,
+                 properties: OrderRow | pd.Series) -> None:
         super().__init__(parent=parent)
 
         # Tells the painter to paint all the background
@@ -156,13 +641,11 @@ class _OrderBaseElement(QWidget):
         self.label_layer_h = QLabel(self)
         self.label_rigidity = QLabel(self)
         self.label_material = QLabel(self)
-        self.label_ref.setStyleSheet(
-            "font-weight: bold;"
-            "font-size: 18px;"
-        )
-        self.label_name.setStyleSheet(
-            "font-size: 18px;"
-        )
+        # Styled in styles.qss
+        self.label_ref.setObjectName('orderRef')
+        self.label_name.setObjectName('orderName')
+        self.label_member.setObjectName('orderMember')
+        self._member_state = None
         self.main_grid_lyt.addWidget(self.label_ref, 1, 1)
         self.main_grid_lyt.addWidget(self.label_name, 1, 2, 1, 2)
         self.main_grid_lyt.addWidget(self.label_member, 2, 1)
@@ -177,61 +660,32 @@ class _OrderBaseElement(QWidget):
         self.setSizePolicy(QSizePolicy.Policy.Minimum,
                            QSizePolicy.Policy.Maximum)
 
-    def set_data(self, properties: pd.Series):
+    def set_data(self, properties: OrderRow | pd.Series):
         """
-        From an order Series, sets the labels to the corresponding values
+        From an order row or Series, sets the labels to the corresponding values
         """
-        self.label_ref.setText(
-            f"#{properties['REF']:0>4n}"
-            # https://stackoverflow.com/questions/40429917/in-python-how-would-you-check-if-a-number-is-one-of-the-integer-types
-            if isinstance(properties['REF'], (int, integer))
-            else f"#{properties['REF']}"
+        self.set_texts(_order_texts(properties))
+
+    def set_texts(self, texts: dict) -> None:
+        """Sets the labels to texts, as given by _order_texts"""
+        self.label_ref.setText(texts['ref'])
+        self.label_name.setText(texts['name'])
+        self.label_member.setText(texts['member'])
+        member_state = (
+            'verified' if(texts['member_state'] is True)
+            else 'unverified' if(texts['member_state'] is False)
+            else 'unknown'  # if(texts['member_state'] is None)
         )
-        self.label_name.setText(
-            properties['NAME']
-        )
-        self.label_member.setText(
-            "Miembro verificado" if(properties['LOOKUP_MEMBER'] is True)
-            else "No verificado" if(properties["LOOKUP_MEMBER"] is False)
-            else "Membresía"  # if(properties['LOOKUP_MEMBER'] is None)
-        )
-        self.label_member.setStyleSheet(
-            "color: black;" if(properties['LOOKUP_MEMBER'] is True)
-            else "color: red;" if(properties['LOOKUP_MEMBER'] is False)
-            else "color: None;"  # if(properties['LOOKUP_MEMBER'] is None)
-        )
-        self.label_comment.setText(
-            properties['COMMENT']
-        )
-        self.label_layer_h.setText(
-            f"Altura capa: {properties['LAYER_H']}"
-        )
-        self.label_rigidity.setText(
-            f"Rigidez: {properties['RIGIDITY']}/5"
-        )
-        self.label_material.setText(
-            f"Material: {properties['COLOUR_MATERIAL']}"
-        )
-
-
-class _SelectableOrder(_OrderBaseElement):
-    def __init__(self, parent: QWidget | None, report_fnc, row_id: int,
-                 properties: pd.Series) -> None:
-        """
-        Report function: f(row_id)
-        """
-        super().__init__(parent=parent, properties=properties)
-        self._row_id = row_id
-        self._report_fnc = report_fnc
-
-    @property
-    def row_id(self):
-        """Returns id given to the order"""
-        return self._row_id
-
-    def mouseReleaseEvent(self, a0: QtGui.QMouseEvent) -> None:  # pylint: disable=invalid-name, missing-function-docstring
-        if self.rect().contains(a0.pos()):
-            self._report_fnc(self.row_id)
+        # Polishing is costly, only when the style changes
+        if member_state != self._member_state:
+            self._member_state = member_state
+            self.label_member.setProperty('memberState', member_state)
+            self.label_member.style().unpolish(self.label_member)
+            self.label_member.style().polish(self.label_member)
+        self.label_comment.setText(texts['comment'])
+        self.label_layer_h.setText(texts['layer_h'])
+        self.label_rigidity.setText(texts['rigidity'])
+        self.label_material.setText(texts['material'])
 
 
 class _OrderWithControls(QWidget):
@@ -240,6 +694,7 @@ class _OrderWithControls(QWidget):
         toggled_func = f(cbId, cbChecked)
         """
         super().__init__(parent=parent)
+        self._toggled_func = toggled_func
         # Tells the painter to paint all the background
         self.setAttribute(QtCore.Qt.WidgetAttribute.WA_StyledBackground, True)
 
@@ -256,7 +711,9 @@ class _OrderWithControls(QWidget):
         self.cb_button_group = QButtonGroup(self.interactive_controls)
         self.cb_button_group.setExclusive(False)
 
-        self.cb_button_group.idToggled.connect(toggled_func)
+        # Clicked rather than toggled, a partially checked box (orders with
+        # different values) is already checked for Qt
+        self.cb_button_group.idClicked.connect(self._on_cb_clicked)
 
         self._approved_cb = QCheckBox("Aprobado", self)
         self._printed_cb = QCheckBox("Impreso", self)
@@ -276,19 +733,48 @@ class _OrderWithControls(QWidget):
         self.setSizePolicy(QSizePolicy.Policy.Minimum,
                            QSizePolicy.Policy.Maximum)
 
-    def change_order(self, order: pd.Series) -> None:
-        """Sets the order object to the corresponding data"""
-        self.order.set_data(order)
+    def _on_cb_clicked(self, cb_id: int) -> None:
+        checkbox = self.cb_button_group.button(cb_id)
+        # Now all the selected orders have the same value
+        checkbox.setTristate(False)
+        self._toggled_func(
+            cb_id, checkbox.checkState() == QtCore.Qt.CheckState.Checked)
 
+    def _set_check_states(self, states: dict) -> None:
+        """Sets each checkbox to its {CBId: Qt.CheckState}, without signals"""
         # Disconnect signals before changing CBs statuses
         # Pair of .disconnect / .connect could be used too,
         # but needs the signal handler as argument. This works just well.
         self.cb_button_group.blockSignals(True)
-
-        self._approved_cb.setChecked(order['APPROVED'])
-        self._printed_cb.setChecked(order['PRINTED'])
-        self._pickedup_cb.setChecked(order['PICKED_UP'])
-        self._paid_cb.setChecked(order['PAID'])
-
+        for cb_id, state in states.items():
+            checkbox = self.cb_button_group.button(cb_id)
+            checkbox.setTristate(
+                state == QtCore.Qt.CheckState.PartiallyChecked)
+            checkbox.setCheckState(state)
         # Enable signals
         self.cb_button_group.blockSignals(False)
+
+    def change_order(self, order: OrderRow | pd.Series) -> None:
+        """Sets the order object to the corresponding data"""
+        self.order.set_data(order)
+        self._set_check_states({
+            cb_id: (QtCore.Qt.CheckState.Checked if bool(order[cb_id.name])
+                    else QtCore.Qt.CheckState.Unchecked)
+            for cb_id in CBId})
+
+    def change_orders(self, orders: OrderTable, row_ids: list) -> None:
+        """
+        Shows a summary of several orders. Checkboxes are partially checked
+        if the orders have different values
+        """
+        self.order.set_texts(_selection_texts(orders, row_ids))
+        positions = np.array([orders.position(row_id) for row_id in row_ids],
+                             dtype=np.intp)
+        states = {}
+        for cb_id in CBId:
+            values = orders.columns[cb_id.name][positions].astype(bool)
+            states[cb_id] = (
+                QtCore.Qt.CheckState.Checked if values.all()
+                else QtCore.Qt.CheckState.Unchecked if not values.any()
+                else QtCore.Qt.CheckState.PartiallyChecked)
+        self._set_check_states(states)
@@ -0,0 +1,118 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module refreshes only the rows that may hold pending orders:
+those from a watermark on, past which orders are mostly completed, and the
+few older ones still pending"""
+
+import time
+
+import numpy as np
+import pandas as pd
+
+from order_store import OrderStore, Watermark, SOURCE_ROW_STRIDE
+
+# Older pending orders read one by one, per source. Beyond them, every row
+# from the oldest pending order left is read
+MAX_STRAGGLERS = 50
+# Seconds between full reads, which find orders completed and reopened
+FULL_READ_INTERVAL = 60*60
+
+
+def find_watermark(orders_df: pd.DataFrame,
+                   max_stragglers: int = MAX_STRAGGLERS,
+                   previous: Watermark | None = None) -> Watermark:
+    """
+    Watermark of the pending orders (as shown, COMPLETION != 1) in orders_df.
+    Of each source, its oldest max_stragglers pending orders are rows, and
+    the next one the start. Orders added later are past the start.
+    With the previous watermark, orders_df holds only its rows, so starts
+    never go back, and sources without orders read keep theirs
+    """
+    row_ids = orders_df.index.to_numpy()
+    pending = (orders_df['COMPLETION'] != 1).to_numpy()
+    sources = row_ids // SOURCE_ROW_STRIDE
+    starts = {}
+    if previous is not None:
+        starts.update((start // SOURCE_ROW_STRIDE, start)
+                      for start in previous.starts)
+    rows = []
+    for source in np.unique(sources).tolist():
+        in_source = sources == source
+        source_pending = np.sort(row_ids[in_source & pending])
+        if len(source_pending) > max_stragglers:
+            start = int(source_pending[max_stragglers])
+        else:
+            start = int(row_ids[in_source].max()) + 1
+        # Only stragglers left: the rows between them and the previous
+        # start were not read, they are not newer
+        start = max(start, starts.get(source, start))
+        starts[source] = start
+        rows.extend(source_pending[source_pending < start].tolist())
+    return Watermark([starts[source] for source in sorted(starts)], rows)
+
+
+class PendingOrderSync:
+    """
+    Reads the whole order store once, and from then on only the rows of the
+    watermark of the orders read last time, so what is read grows with the
+    pending orders instead of with every order ever made. A full read every
+    FULL_READ_INTERVAL shows orders reopened before the watermark.
+    Not thread-safe: use it from one thread only.
+    """
+    def __init__(self, order_store: OrderStore,
+                 full_read_interval: float = FULL_READ_INTERVAL) -> None:
+        self._order_store = order_store
+        self._full_read_interval = full_read_interval
+        self._watermark = None
+        self._full_read_at = None
+
+    def begin_seed(self) -> bool:
+        """Called before reading the orders given to seed"""
+        return True
+
+    def seed(self, orders_df: pd.DataFrame) -> None:
+        """Takes all the orders, read otherwise, e.g. in chunks"""
+        self._watermark = find_watermark(orders_df)
+        self._full_read_at = time.monotonic()
+
+    def fetch(self) -> pd.DataFrame | None:
+        """
+        Refreshes the orders: the pending ones, and some completed. Returns
+        the orders DataFrame, or None if the refresh failed
+        """
+        full_read = (self._watermark is None
+                     or time.monotonic() - self._full_read_at
+                     >= self._full_read_interval)
+        if full_read:
+            orders_df = self._order_store.read()
+            if orders_df is not None:
+                self._full_read_at = time.monotonic()
+        else:
+            orders_df = self._order_store.read_pending(self._watermark)
+        if orders_df is None:
+            return None
+        # Advances as orders are completed. Whole reads start it again, and
+        # find orders reopened before it
+        self._watermark = find_watermark(
+            orders_df, previous=None if full_read else self._watermark)
+        return orders_df
@@ -0,0 +1,83 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module times the startup phases of the app, from when it is
+first imported. Import it before anything else to time the imports too"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+
+class StartupProfile:
+    """
+    Start and end of each startup phase, as seconds since it was created.
+    Phases may run in other threads
+    """
+    def __init__(self) -> None:
+        self._started_at = time.perf_counter()
+        self._last_mark = 0.
+        self._lock = threading.Lock()
+        self._phases = {}  # name -> [start, end or None]
+
+    def _now(self) -> float:
+        return time.perf_counter() - self._started_at
+
+    def mark(self, name: str) -> None:
+        """Ends a phase started when the previous one was marked"""
+        now = self._now()
+        with self._lock:
+            self._phases.setdefault(name, [self._last_mark, now])
+            self._last_mark = now
+
+    def begin(self, name: str) -> None:
+        """Starts a phase, if it had not started yet"""
+        with self._lock:
+            self._phases.setdefault(name, [self._now(), None])
+
+    def end(self, name: str) -> None:
+        """Ends a phase started with begin, only the first time"""
+        with self._lock:
+            if name in self._phases and self._phases[name][1] is None:
+                self._phases[name][1] = self._now()
+
+    @contextmanager
+    def phase(self, name: str):
+        """Times the block as phase name"""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end(name)
+
+    def report(self) -> str:
+        """Phases started, in order, in milliseconds"""
+        lines = [f'{"Phase":<24}{"Start":>10}{"Took":>10}']
+        with self._lock:
+            phases = sorted(self._phases.items(), key=lambda item: item[1][0])
+        for name, (start, end) in phases:
+            took = '-' if end is None else f'{(end - start)*1000:.0f}'
+            lines.append(f'{name:<24}{start*1000:>10.0f}{took:>10}')
+        return '\n'.join(lines)
+
+
+STARTUP = StartupProfile()
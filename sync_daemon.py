@@ -0,0 +1,402 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """Headless sync daemon: the only one connected to the order store
+(and so the only one with Google credentials and spending API quota). It
+polls the orders and serves them, as differences, to the ReproUI apps of the
+workshop, and writes their changes. Apps connect to it setting DAEMON_ADDRESS
+in their configuration, see RemoteOrderStore"""
+
+import argparse
+import json
+import os
+import socket
+import socketserver
+import stat
+import threading
+import time
+import uuid
+from contextlib import closing
+
+import pandas as pd
+
+from incremental_sync import IncrementalOrderSync
+from metrics import log_to_file
+from order_sources import load_config, create_order_store, stop_credentials
+from order_store import OrderChanges, OrderStore
+from order_table import OrderTable
+from sync_scheduler import SyncScheduler
+
+# host:port, or the path of a Unix socket. There is no authentication, so
+# it must not be reachable from outside the workshop computers
+DEFAULT_ADDRESS = '127.0.0.1:8765'
+# Seconds a client waits for an answer. Writes may wait for a fetch in
+# progress, or for the rate limit
+DAEMON_TIMEOUT = 60
+
+
+# Wire format: one JSON request per connection, answered by one JSON line
+def _json_default(value):
+    # NumPy scalars, from object arrays of NumPy columns
+    return value.item()
+
+
+def _encode_orders(orders_df: pd.DataFrame) -> dict:
+    """Orders as JSON-serializable columns, with their dtypes"""
+    columns = {}
+    dtypes = {}
+    categories = {}
+    for col, dtype in orders_df.dtypes.items():
+        values = orders_df[col]
+        if dtype.kind == 'M':
+            values = values.dt.strftime('%Y-%m-%dT%H:%M:%S')
+        elif isinstance(dtype, pd.CategoricalDtype):
+            categories[col] = dtype.categories.tolist()
+        columns[col] = values.to_numpy(dtype=object, na_value=None).tolist()
+        dtypes[col] = str(dtype)
+    return {'index': orders_df.index.tolist(), 'columns': columns,
+            'dtypes': dtypes, 'categories': categories}
+
+
+def _decode_orders(payload: dict) -> pd.DataFrame:
+    """Orders encoded by _encode_orders, with their dtypes"""
+    orders_df = pd.DataFrame(
+        payload['columns'],
+        index=pd.Index(payload['index'], dtype='int64'))
+    for col, dtype in payload['dtypes'].items():
+        values = orders_df[col]
+        if dtype.startswith('datetime'):
+            orders_df[col] = pd.to_datetime(values, errors='coerce')
+        elif dtype == 'category':
+            orders_df[col] = values.astype(
+                pd.CategoricalDtype(payload['categories'][col]))
+        else:
+            orders_df[col] = values.astype(dtype)
+    return orders_df
+
+
+def _parse_address(address: str) -> tuple[int, object]:
+    """Socket family and address of 'host:port' or a Unix socket path"""
+    host, _, port = address.rpartition(':')
+    if host and port.isdigit():
+        return socket.AF_INET, (host, int(port))
+    return socket.AF_UNIX, address
+
+
+class OrderSnapshot:
+    """
+    Last orders fetched by the daemon, each tagged with the revision that
+    last changed it, so clients get only what changed since their last
+    refresh. Removed orders leave a tombstone. Revisions are [instance, n]:
+    those of a previous run of the daemon get all the orders.
+    Thread safe.
+    """
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._instance = uuid.uuid4().hex
+        self._revision = 0
+        self._orders_df = None
+        self._table = None  # The same orders, to compare and change them
+        self._row_revisions = None  # ROW_ID -> revision
+        self._removed = {}  # ROW_ID -> revision
+
+    def update(self, orders_df: pd.DataFrame) -> bool:
+        """Replaces the orders, returns whether any order changed"""
+        table = OrderTable(orders_df)
+        with self._lock:
+            if self._orders_df is None:
+                changed_ids, added, removed = set(), orders_df.index, []
+            else:
+                changed_ids = table.changed_ids(self._table)
+                added = orders_df.index.difference(self._orders_df.index)
+                removed = self._orders_df.index.difference(orders_df.index)
+                if not changed_ids and not len(added) and not len(removed):
+                    return False
+            self._revision += 1
+            if self._row_revisions is None:
+                row_revisions = pd.Series(self._revision,
+                                          index=orders_df.index)
+            else:
+                row_revisions = self._row_revisions.reindex(
+                    orders_df.index, fill_value=self._revision)
+                row_revisions.loc[list(changed_ids)] = self._revision
+            for row in removed:
+                self._removed[row] = self._revision
+            for row in added:
+                self._removed.pop(row, None)
+            self._orders_df = orders_df
+            self._table = table
+            self._row_revisions = row_revisions
+            return True
+
+    def set_cells(self, cells: dict[tuple[int, str], object]) -> None:
+        """Changes cells already written to the order store"""
+        with self._lock:
+            if self._orders_df is None:
+                return
+            self._revision += 1
+            for (row, col), value in cells.items():
+                if row in self._table:
+                    self._table.set(row, col, value)
+                    self._orders_df.at[row, col] = value
+                    self._row_revisions.at[row] = self._revision
+
+    def changed_since(self, revision=None) -> OrderChanges | None:
+        """Like OrderStore.changed_since. None before the first fetch"""
+        with self._lock:
+            if self._orders_df is None:
+                return None
+            new_revision = [self._instance, self._revision]
+            if revision is None or revision[0] != self._instance:
+                return OrderChanges(self._orders_df.copy(), [], new_revision,
+                                    full=True)
+            # Boolean indexing copies
+            orders_df = self._orders_df[
+                self._row_revisions.to_numpy() > revision[1]]
+            removed = [row for row, row_revision in self._removed.items()
+                       if row_revision > revision[1]]
+            return OrderChanges(orders_df, removed, new_revision)
+
+
+class SyncDaemon:
+    """
+    Polls the order store, as scheduled by a SyncScheduler, into an
+    OrderSnapshot, and writes the cells clients send. Reads and writes to the
+    order store are serialized, so a fetch that started before a write never
+    overwrites it in the snapshot
+    """
+    def __init__(self, order_store: OrderStore, scheduler: SyncScheduler, *,
+                 incremental: bool = False) -> None:
+        self._order_store = order_store
+        self._order_sync = (IncrementalOrderSync(order_store) if incremental
+                            else None)
+        self._scheduler = scheduler
+        self._store_lock = threading.Lock()
+        self._stop = threading.Event()
+        self.snapshot = OrderSnapshot()
+
+    # pylint: disable=broad-except
+    def _fetch(self) -> pd.DataFrame | None:
+        try:
+            if self._order_sync is not None:
+                return self._order_sync.fetch()
+            return self._order_store.read()
+        except Exception as err:
+            print(err)
+            return None
+
+    def _commit(self, cells: dict) -> dict | None:
+        try:
+            return self._order_store.commit_cells(cells)
+        except Exception as err:
+            print(err)
+            return None
+    # pylint: enable=broad-except
+
+    def poll_forever(self) -> None:
+        """Fetches the orders as scheduled, until stop is called"""
+        delay = 0.
+        while not self._stop.wait(delay):
+            with self._store_lock:
+                if not self._scheduler.try_read():
+                    delay = self._scheduler.read_wait()
+                    continue
+                orders_df = self._fetch()
+                if orders_df is None:
+                    self._scheduler.failed()
+                else:
+                    self._scheduler.fetched(self.snapshot.update(orders_df))
+                delay = self._scheduler.poll_delay()
+
+    def stop(self) -> None:
+        """Stops poll_forever, after the fetch in progress"""
+        self._stop.set()
+
+    def commit_cells(self, cells: dict[tuple[int, str], object]
+                     ) -> dict[tuple[int, str], object] | None:
+        """
+        Writes cells to the order store, then to the snapshot as stored.
+        Returns them as stored, None if not written
+        """
+        with self._store_lock:
+            # Reads always leave enough for a write, it won't be long
+            while not self._scheduler.try_write():
+                time.sleep(self._scheduler.write_wait())
+            # Someone is at work, poll more often
+            self._scheduler.clicked()
+            stored = self._commit(cells)
+            if stored is not None:
+                self._scheduler.written()
+                self.snapshot.set_cells(stored)
+            else:
+                self._scheduler.failed()
+            return stored
+
+    def handle(self, request: dict) -> dict:
+        """Answers a request of a RemoteOrderStore"""
+        if request.get('op') == 'changed_since':
+            changes = self.snapshot.changed_since(request.get('revision'))
+            if changes is None:
+                return {'error': 'No orders fetched yet'}
+            return {'orders': _encode_orders(changes.orders),
+                    'removed': changes.removed,
+                    'revision': changes.revision,
+                    'full': changes.full}
+        if request.get('op') == 'write_cells':
+            stored = self.commit_cells({
+                (row, col): value for row, col, value in request['cells']})
+            return {'written': stored is not None,
+                    'cells': [[row, col, value] for (row, col), value
+                              in (stored or {}).items()]}
+        return {'error': f'Unknown request {request.get("op")}'}
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self) -> None:
+        try:
+            response = self.server.sync_daemon.handle(
+                json.loads(self.rfile.readline()))
+        except (ValueError, KeyError, TypeError) as err:
+            response = {'error': f'Bad request: {err}'}
+        self.wfile.write(json.dumps(response, default=_json_default)
+                         .encode('utf-8') + b'\n')
+
+
+def create_server(address: str,
+                  sync_daemon: SyncDaemon) -> socketserver.BaseServer:
+    """
+    Server answering the requests of clients at address. FileExistsError if
+    it is the path of something other than a socket
+    """
+    family, server_address = _parse_address(address)
+    if family == socket.AF_UNIX:
+        # Left behind by a previous run. Anything else may be a mistyped
+        # address, and is not ours to remove
+        if os.path.lexists(server_address):
+            if not stat.S_ISSOCK(os.lstat(server_address).st_mode):
+                raise FileExistsError(
+                    f'{server_address} exists and is not a socket')
+            os.remove(server_address)
+        server_class = socketserver.ThreadingUnixStreamServer  # pylint: disable=no-member
+    else:
+        server_class = socketserver.ThreadingTCPServer
+    server_class.allow_reuse_address = True
+    server_class.daemon_threads = True
+    server = server_class(server_address, _RequestHandler)
+    server.sync_daemon = sync_daemon
+    return server
+
+
+class RemoteOrderStore(OrderStore):
+    """
+    Orders served by a sync daemon at address, 'host:port' or the path of a
+    Unix socket. It needs no credentials, and costs no API quota. A
+    connection is opened per call, so it can be used from any thread.
+    """
+    def __init__(self, address: str, timeout: float = DAEMON_TIMEOUT) -> None:
+        self._family, self._address = _parse_address(address)
+        self._timeout = timeout
+
+    def _connect(self) -> socket.socket:
+        if self._family == socket.AF_INET:
+            return socket.create_connection(self._address, self._timeout)
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)  # pylint: disable=no-member
+        sock.settimeout(self._timeout)
+        try:
+            sock.connect(self._address)
+        except OSError:
+            sock.close()
+            raise
+        return sock
+
+    def _call(self, request: dict) -> dict | None:
+        try:
+            with closing(self._connect()) as sock, \
+                    sock.makefile('rwb') as stream:
+                stream.write(json.dumps(request, default=_json_default)
+                             .encode('utf-8') + b'\n')
+                stream.flush()
+                response = json.loads(stream.readline())
+        except (OSError, ValueError) as err:
+            print(err)
+            return None
+        if 'error' in response:
+            print(response['error'])
+            return None
+        return response
+
+    def read(self) -> pd.DataFrame | None:
+        changes = self.changed_since()
+        return None if changes is None else changes.orders
+
+    def changed_since(self, revision=None) -> OrderChanges | None:
+        response = self._call({'op': 'changed_since', 'revision': revision})
+        if response is None:
+            return None
+        return OrderChanges(_decode_orders(response['orders']),
+                            response['removed'], response['revision'],
+                            response['full'])
+
+    def write_cells(self, cells: dict[tuple[int, str], object]) -> bool:
+        return self.commit_cells(cells) is not None
+
+    def commit_cells(self, cells: dict[tuple[int, str], object]
+                     ) -> dict[tuple[int, str], object] | None:
+        response = self._call({'op': 'write_cells', 'cells': [
+            [row, col, value] for (row, col), value in cells.items()]})
+        if response is None or not response['written']:
+            return None
+        return {(row, col): value for row, col, value in response['cells']}
+
+
+def main() -> None:
+    """Runs the daemon with the configuration file, until interrupted"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--address',
+        help='host:port or Unix socket path to listen at. DAEMON_ADDRESS of '
+        f'the configuration by default, else {DEFAULT_ADDRESS}')
+    args = parser.parse_args()
+    config = load_config()
+    if config.get('METRICS_LOG'):
+        log_to_file(config['METRICS_LOG'])
+    sync_daemon = SyncDaemon(
+        create_order_store(config, via_daemon=False),
+        SyncScheduler.from_config(config),
+        incremental=config.get('INCREMENTAL_SYNC', False))
+    address = args.address or config.get('DAEMON_ADDRESS', DEFAULT_ADDRESS)
+    server = create_server(address, sync_daemon)
+    poller = threading.Thread(target=sync_daemon.poll_forever, daemon=True)
+    poller.start()
+    print(f'Serving orders at {address}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sync_daemon.stop()
+        server.server_close()
+        stop_credentials()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,211 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module decides when to read and write the orders: how often
+to poll, how long to wait for more clicks before writing, how long to back
+off after errors, and how many requests can be made without running out of
+API quota"""
+
+import random
+import threading
+import time
+
+# Bounds of the delay after failed reads or writes, in seconds
+RETRY_MIN_DELAY = 1
+RETRY_MAX_DELAY = 5*60
+# Tokens taken by each operation. A write reads the cells back in the same
+# request, see order_store.OrderStore.commit_cells
+READ_COST = 1
+WRITE_COST = 1
+# The user counts as active this long after their last click, in seconds
+ACTIVITY_WINDOW = 5*60
+# Sync operations allowed per minute, and at once. Sheets API allows 60
+# requests per minute and user, and each operation takes one or two
+SYNC_RATE_LIMIT = 20
+SYNC_BURST = 5
+
+
+class TokenBucket:
+    """
+    Allows up to capacity operations at once, refilled at rate tokens per
+    second. Thread safe: reads made of several requests take their tokens
+    from the background thread
+    """
+    def __init__(self, rate: float, capacity: float) -> None:
+        self._rate = rate
+        self._capacity = capacity
+        self._tokens = capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self._capacity,
+                           self._tokens + (now - self._updated_at)*self._rate)
+        self._updated_at = now
+
+    def try_take(self, tokens: float, reserve: float = 0) -> bool:
+        """Takes tokens if, after that, at least reserve would be left"""
+        with self._lock:
+            self._refill()
+            if self._tokens - tokens < reserve:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def wait_time(self, tokens: float, reserve: float = 0) -> float:
+        """Seconds until try_take(tokens, reserve) can succeed"""
+        with self._lock:
+            self._refill()
+            missing = tokens + reserve - self._tokens
+        return max(0., missing/self._rate)
+
+    def take(self, tokens: float, reserve: float = 0) -> None:
+        """Takes tokens, sleeping until try_take(tokens, reserve) succeeds"""
+        while not self.try_take(tokens, reserve):
+            time.sleep(self.wait_time(tokens, reserve))
+
+
+class SyncScheduler:
+    """
+    Delays of the next read and write, as seconds from now.
+    Polls get closer while orders keep changing or the user is active, down
+    to min_interval, and further apart while nothing changes, up to
+    max_interval. After errors, both reads and writes back off exponentially,
+    with jitter so several computers don't retry in lockstep.
+    Writes wait write_delay after the last click, to batch clicks together,
+    but never more than max_write_delay after the first click not written.
+    Reads and writes share a token bucket of rate_limit operations per
+    minute; reads leave enough tokens for a write, so writes go first
+    """
+    def __init__(self, *, min_interval: float, max_interval: float,
+                 write_delay: float, max_write_delay: float,
+                 rate_limit: float, burst: float) -> None:
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._interval = min_interval
+        self._write_delay = write_delay
+        self._max_write_delay = max_write_delay
+        self._bucket = TokenBucket(rate_limit/60,
+                                   max(burst, READ_COST + WRITE_COST))
+        self._failures = 0
+        self._last_activity = None
+        self._first_unwritten = None  # When the oldest click was made
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'SyncScheduler':
+        """
+        Scheduler with the delays and limits of the configuration file.
+        Without the optional settings, polls are every DB_RETRIEVE_INTERVAL
+        """
+        return cls(
+            min_interval=config.get('DB_RETRIEVE_MIN_INTERVAL',
+                                    config['DB_RETRIEVE_INTERVAL']),
+            max_interval=config['DB_RETRIEVE_INTERVAL'],
+            write_delay=config['DB_UPDATE_DELAY'],
+            max_write_delay=config.get('DB_UPDATE_MAX_DELAY',
+                                       3*config['DB_UPDATE_DELAY']),
+            rate_limit=config.get('SYNC_RATE_LIMIT', SYNC_RATE_LIMIT),
+            burst=config.get('SYNC_BURST', SYNC_BURST))
+
+    def _backoff(self) -> float:
+        """Half the exponential delay, plus up to the other half at random"""
+        delay = min(RETRY_MAX_DELAY,
+                    RETRY_MIN_DELAY*2**(self._failures - 1))
+        return delay/2 + random.uniform(0, delay/2)
+
+    def _user_active(self) -> bool:
+        return (self._last_activity is not None
+                and time.monotonic() - self._last_activity < ACTIVITY_WINDOW)
+
+    # Events
+    def fetched(self, changed: bool) -> None:
+        """A read succeeded, and saw changes or not"""
+        self._failures = 0
+        if changed:
+            self._interval = max(self._min_interval, self._interval/2)
+        else:
+            self._interval = min(self._max_interval, self._interval*1.5)
+
+    def written(self) -> None:
+        """A write succeeded"""
+        self._failures = 0
+
+    def failed(self) -> None:
+        """A read or write failed"""
+        self._failures += 1
+
+    def clicked(self) -> None:
+        """The user changed an order, which waits to be written"""
+        now = time.monotonic()
+        self._last_activity = now
+        if self._first_unwritten is None:
+            self._first_unwritten = now
+
+    def writing(self) -> None:
+        """Every click made so far is being written"""
+        self._first_unwritten = None
+
+    # Delays
+    def retry_delay(self) -> float:
+        """Delay before trying again a failed operation"""
+        return self._backoff()
+
+    def poll_delay(self) -> float:
+        """Delay of the next periodic read"""
+        if self._failures:
+            return self._backoff()
+        if self._user_active():
+            return self._min_interval
+        return self._interval
+
+    def write_delay(self) -> float:
+        """Delay of the next write, after a click"""
+        if self._first_unwritten is None:
+            return self._write_delay
+        ceiling = (self._first_unwritten + self._max_write_delay
+                   - time.monotonic())
+        return max(0., min(self._write_delay, ceiling))
+
+    # Quota
+    def try_read(self) -> bool:
+        """Takes the tokens of a read, if that leaves enough for a write"""
+        return self._bucket.try_take(READ_COST, reserve=WRITE_COST)
+
+    def read_wait(self) -> float:
+        """Delay until try_read can succeed"""
+        return self._bucket.wait_time(READ_COST, reserve=WRITE_COST)
+
+    def read_request(self) -> None:
+        """
+        Takes the tokens of one more request of a read made of several, e.g.
+        in chunks, waiting for them. Called from the background thread
+        """
+        self._bucket.take(READ_COST, reserve=WRITE_COST)
+
+    def try_write(self) -> bool:
+        """Takes the tokens of a write"""
+        return self._bucket.try_take(WRITE_COST)
+
+    def write_wait(self) -> float:
+        """Delay until try_write can succeed"""
+        return self._bucket.wait_time(WRITE_COST)
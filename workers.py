@@ -0,0 +1,149 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module runs the spreadsheet I/O in a background thread, so the
+GUI event loop never waits for the network"""
+
+# pylint: disable=no-name-in-module
+from PyQt6.QtCore import QObject, QThread, pyqtSignal, pyqtSlot
+# pylint: enable=no-name-in-module
+
+
+class _SpreadSheetWorker(QObject):
+    """
+    Lives in the background thread. Runs the fetch (read & parse) and write
+    functions it is given and reports their results through signals
+    """
+    fetched = pyqtSignal(object)
+    fetched_part = pyqtSignal(object)
+    written = pyqtSignal(object)
+
+    def __init__(self, fetch_func, write_func) -> None:
+        """
+        fetch_func = f(on_part) -> orders, write_func = f(payload) -> result
+        """
+        super().__init__()
+        self._fetch_func = fetch_func
+        self._write_func = write_func
+
+    # An exception escaping a slot aborts the whole app, so failures are
+    # printed and reported as a None result
+    # pylint: disable=broad-except, missing-function-docstring
+    @pyqtSlot()
+    def fetch(self) -> None:
+        try:
+            result = self._fetch_func(self.fetched_part.emit)
+        except Exception as err:
+            print(err)
+            result = None
+        self.fetched.emit(result)
+
+    @pyqtSlot(object)
+    def write(self, payload) -> None:
+        try:
+            result = self._write_func(payload)
+        except Exception as err:
+            print(err)
+            result = None
+        self.written.emit(result)
+    # pylint: enable=broad-except, missing-function-docstring
+
+
+class BackgroundSync(QObject):
+    """
+    Owns the worker thread and lives in the GUI thread. Fetch requests made
+    while another fetch is in flight are coalesced into it, and a fetch that
+    started before a write is discarded and repeated afterwards, so its stale
+    result never reaches the UI.
+    Jobs run in the order they are requested.
+    """
+    orders_fetched = pyqtSignal(object)
+    # Orders read so far by a fetch in flight
+    orders_fetched_part = pyqtSignal(object)
+    orders_written = pyqtSignal(object)
+
+    # Emitted here, received by the worker in its own thread
+    _fetch_requested = pyqtSignal()
+    _write_requested = pyqtSignal(object)
+
+    def __init__(self, parent: QObject | None, fetch_func, write_func) -> None:
+        """
+        fetch_func = f(on_part) -> orders, write_func = f(payload) -> result
+        Both are called from the background thread. fetch_func may call
+        on_part(orders) with the orders read so far, to show them before
+        the fetch ends
+        """
+        super().__init__(parent=parent)
+        self._fetch_in_flight = False
+        self._fetch_is_stale = False
+
+        self._thread = QThread(self)
+        self._worker = _SpreadSheetWorker(fetch_func, write_func)
+        self._worker.moveToThread(self._thread)
+        # Receivers live in other threads, so these are queued connections
+        self._fetch_requested.connect(self._worker.fetch)
+        self._write_requested.connect(self._worker.write)
+        self._worker.fetched.connect(self._on_fetched)
+        self._worker.fetched_part.connect(self._on_fetched_part)
+        self._worker.written.connect(self.orders_written)
+        self._thread.finished.connect(self._worker.deleteLater)
+        self._thread.start()
+
+    def request_fetch(self) -> None:
+        """Asks for a fetch, unless there is already one in flight"""
+        if self._fetch_in_flight:
+            return
+        self._fetch_in_flight = True
+        self._fetch_requested.emit()
+
+    def request_write(self, payload) -> None:
+        """
+        Asks for a write. Its result tells what was written, so there is no
+        fetch after it, but a fetch in flight is repeated
+        """
+        self._write_requested.emit(payload)
+        if self._fetch_in_flight:
+            self._fetch_is_stale = True
+
+    @property
+    def fetch_in_flight(self) -> bool:
+        """Whether a fetch has been requested and has not finished yet"""
+        return self._fetch_in_flight
+
+    @pyqtSlot(object)
+    def _on_fetched_part(self, orders) -> None:
+        if not self._fetch_is_stale:
+            self.orders_fetched_part.emit(orders)
+
+    @pyqtSlot(object)
+    def _on_fetched(self, orders) -> None:
+        self._fetch_in_flight = False
+        if self._fetch_is_stale:
+            self._fetch_is_stale = False
+            self.request_fetch()
+        else:
+            self.orders_fetched.emit(orders)
+
+    def stop(self) -> None:
+        """Stops the background thread, after it finishes its current job"""
+        self._thread.quit()
+        self._thread.wait()
@@ -0,0 +1,92 @@
+"""
+     This file is part of ReproUI.
+
+    ReproUI is free software: you can redistribute it and/or modify it under
+    the terms of the GNU General Public License as published by the Free
+    Software Foundation, either version 3 of the License, or (at your option)
+    any later version.
+
+    ReproUI is distributed in the hope that it will be useful, but WITHOUT ANY
+    WARRANTY; without even the implied warranty of MERCHANTABILITY or FITNESS
+    FOR A PARTICULAR PURPOSE. See the GNU General Public License for more
+    details.
+
+    You should have received a copy of the GNU General Public License along
+    with ReproUI. If not, see <https://www.gnu.org/licenses/>.
+"""
+__author__ = "Echedey Luis Álvaerz"
+__copyright__ = "Copyright 2022, Echedey Luis Álvarez"
+__credits__ = ["Echedey Luis Álvarez"]
+__license__ = "GPL v3"
+__version__ = "1.0.0"
+__status__ = "Prototype"
+__doc__ = """This module keeps a durable journal of the checkbox changes not
+written to the spreadsheet yet, so they survive network errors and restarts"""
+
+import sqlite3
+import time
+from contextlib import closing
+
+
+class WriteJournal:
+    """
+    Append-only SQLite journal, in WAL mode, of pending cell changes. Entries
+    are removed once the spreadsheet acknowledges them.
+    A connection is opened per call, so it can be used from any thread.
+    """
+    def __init__(self, path: str) -> None:
+        self._path = path
+        with closing(self._connect()) as con, con:
+            con.execute('PRAGMA journal_mode=WAL')
+            con.execute('CREATE TABLE IF NOT EXISTS changes ('
+                        'seq INTEGER PRIMARY KEY AUTOINCREMENT, '
+                        'row INTEGER NOT NULL, '
+                        'col TEXT NOT NULL, '
+                        'value INTEGER NOT NULL, '
+                        'created_at REAL NOT NULL)')
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self._path, timeout=10)
+
+    def append_many(self, changes: list[tuple[int, str, bool]]) -> None:
+        """
+        Records (row, col, value) changes, durably and in one transaction,
+        before they are written anywhere else
+        """
+        created_at = time.time()
+        with closing(self._connect()) as con, con:
+            con.executemany('INSERT INTO changes (row, col, value, created_at) '
+                            'VALUES (?, ?, ?, ?)',
+                            [(int(row), col, int(value), created_at)
+                             for row, col, value in changes])
+
+    def pending(self, limit: int | None = None) -> list[tuple]:
+        """
+        Pending changes as (seq, row, col, value), oldest first. Only the
+        latest change of each cell is returned, with its seq
+        """
+        # SQLite takes the other columns from the row holding MAX(seq)
+        with closing(self._connect()) as con:
+            changes = con.execute(
+                'SELECT MAX(seq), row, col, value FROM changes '
+                'GROUP BY row, col ORDER BY MAX(seq) LIMIT ?',
+                (-1 if limit is None else limit,)).fetchall()
+        return [(seq, row, col, bool(value))
+                for seq, row, col, value in changes]
+
+    def ack(self, changes: list[tuple]) -> None:
+        """
+        Removes the given changes, once written, and every older change of
+        the same cells. Newer changes of those cells are kept
+        """
+        with closing(self._connect()) as con, con:
+            con.executemany('DELETE FROM changes WHERE row = ? AND col = ? '
+                            'AND seq <= ?',
+                            [(row, col, seq) for seq, row, col, _ in changes])
+
+    def count(self) -> int:
+        """Number of cells with pending changes"""
+        with closing(self._connect()) as con:
+            return con.execute(
+                'SELECT COUNT(*) FROM (SELECT 1 FROM changes '
+                'GROUP BY row, col)').fetchone()[0]